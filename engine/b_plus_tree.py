@@ -7,6 +7,18 @@ from storage.buffer_pool_manager import BufferPoolManager, Page
 INVALID_PAGE_ID = -1
 
 
+# 预编译的头部和单元格式，与下面各页面类中的 HEADER_FORMAT / KEY_FORMAT / POINTER_FORMAT / RID_FORMAT 拼接后一致
+_HEADER = struct.Struct('bH')
+_POINTER = struct.Struct('i')
+_INTERNAL_CELL = struct.Struct('16si')
+_LEAF_CELL = struct.Struct('16sii')
+# 与 _LEAF_CELL 布局相同，但跳过键，只解出 RID（打包时会把键清零，因此只用于解包）
+_LEAF_CELL_RID = struct.Struct('16xii')
+# 叶子单元中键之后的 RID 部分
+_RID = struct.Struct('ii')
+_SIBLING_POINTERS = struct.Struct('2i')
+
+
 # --- 辅助类：定义页面布局和序列化/反序列化 ---
 
 class BPlusTreePage:
@@ -27,14 +39,12 @@ class BPlusTreePage:
             return
 
         # 从页面数据中解包头部信息
-        header_data = self.data[:self.HEADER_SIZE]
-        is_leaf_byte, self.num_keys = struct.unpack(self.HEADER_FORMAT, header_data)
+        is_leaf_byte, self.num_keys = _HEADER.unpack_from(self.data)
         self.is_leaf = bool(is_leaf_byte)
 
     def serialize_header(self):
         """将头部信息（节点类型、键数量）序列化回页面数据中。"""
-        header_data = struct.pack(self.HEADER_FORMAT, int(self.is_leaf), self.num_keys)
-        self.data[:self.HEADER_SIZE] = header_data
+        _HEADER.pack_into(self.data, 0, int(self.is_leaf), self.num_keys)
 
     def get_num_keys(self) -> int:
         """返回当前节点中的键数量。"""
@@ -76,20 +86,14 @@ class InternalPage(BPlusTreePage):
         if offset + self.POINTER_SIZE > len(self.data): return
 
         # 读取第一个指针 (ptr_0)
-        ptr_data = self.data[offset: offset + self.POINTER_SIZE]
-        self.pointers.append(struct.unpack(self.POINTER_FORMAT, ptr_data)[0])
+        self.pointers.append(_POINTER.unpack_from(self.data, offset)[0])
         offset += self.POINTER_SIZE
 
-        # 依次读取 (key_i, ptr_i) 对
-        for _ in range(self.num_keys):
-            if offset + self.CELL_SIZE > len(self.data): break  # 安全检查
-            key_data = self.data[offset: offset + self.KEY_SIZE]
-            self.keys.append(struct.unpack(self.KEY_FORMAT, key_data)[0])
-            offset += self.KEY_SIZE
-
-            ptr_data = self.data[offset: offset + self.POINTER_SIZE]
-            self.pointers.append(struct.unpack(self.POINTER_FORMAT, ptr_data)[0])
-            offset += self.POINTER_SIZE
+        # 依次读取 (key_i, ptr_i) 对：整段单元区一次 iter_unpack
+        num_cells = min(self.num_keys, (len(self.data) - offset) // self.CELL_SIZE)  # 安全检查
+        for key, pointer in _INTERNAL_CELL.iter_unpack(memoryview(self.data)[offset:offset + num_cells * self.CELL_SIZE]):
+            self.keys.append(key)
+            self.pointers.append(pointer)
 
     def serialize(self):
         """将内存中的键和指针列表序列化回页面的字节数据中。"""
@@ -98,15 +102,14 @@ class InternalPage(BPlusTreePage):
         offset = self.HEADER_SIZE
 
         # 写入第一个指针
-        struct.pack_into(self.POINTER_FORMAT, self.data, offset, self.pointers[0])
+        _POINTER.pack_into(self.data, offset, self.pointers[0])
         offset += self.POINTER_SIZE
 
-        # 依次写入后续的 (键, 指针) 对
-        for i in range(self.num_keys):
-            struct.pack_into(self.KEY_FORMAT, self.data, offset, self.keys[i])
-            offset += self.KEY_SIZE
-            struct.pack_into(self.POINTER_FORMAT, self.data, offset, self.pointers[i + 1])
-            offset += self.POINTER_SIZE
+        # 依次将后续的 (键, 指针) 对直接打包进页面缓冲区，不产生中间的 bytes 对象
+        data, pack_into, cell_size = self.data, _INTERNAL_CELL.pack_into, self.CELL_SIZE
+        for key, pointer in zip(self.keys, self.pointers[1:]):
+            pack_into(data, offset, key, pointer)
+            offset += cell_size
 
     def lookup(self, key) -> int:
         """根据给定的键，查找应该访问的下一个子节点的 page_id。"""
@@ -115,6 +118,28 @@ class InternalPage(BPlusTreePage):
         idx = bisect.bisect_right(self.keys, key)
         return self.pointers[idx]
 
+    @classmethod
+    def lookup_in_page(cls, data: bytearray, key) -> int:
+        """
+        与 lookup 结果相同，但直接在页面字节上二分查找，不反序列化整个节点。
+        只读的下降路径（search）每层只需访问 O(log n) 个键，而不是解包全部键和指针。
+        """
+        num_keys = min(_HEADER.unpack_from(data)[1],
+                       (len(data) - cls.HEADER_SIZE - cls.POINTER_SIZE) // cls.CELL_SIZE)
+        # 第 i 个键（从 0 开始）位于 keys_start + i * CELL_SIZE，其右侧指针紧随其后
+        keys_start = cls.HEADER_SIZE + cls.POINTER_SIZE
+        lo, hi = 0, num_keys
+        while lo < hi:
+            mid = (lo + hi) // 2
+            cell = keys_start + mid * cls.CELL_SIZE
+            if key < data[cell:cell + cls.KEY_SIZE]:
+                hi = mid
+            else:
+                lo = mid + 1
+        if lo == 0:
+            return _POINTER.unpack_from(data, cls.HEADER_SIZE)[0]
+        return _POINTER.unpack_from(data, keys_start + (lo - 1) * cls.CELL_SIZE + cls.KEY_SIZE)[0]
+
     def is_full(self) -> bool:
         """检查页面是否已满。"""
         return self.get_num_keys() >= self.get_max_keys()
@@ -171,19 +196,13 @@ class LeafPage(BPlusTreePage):
         offset = self.HEADER_SIZE
         # 读取前驱和后继兄弟节点的 page_id
         if len(self.data) >= self.LEAF_HEADER_SIZE:
-            self.prev_page_id, self.next_page_id = struct.unpack_from(
-                f'2{self.SIBLING_POINTER_FORMAT}', self.data, offset
-            )
+            self.prev_page_id, self.next_page_id = _SIBLING_POINTERS.unpack_from(self.data, offset)
             offset += 2 * self.SIBLING_POINTER_SIZE
 
-        # 读取 (键, RID) 对
-        for _ in range(self.num_keys):
-            if offset + self.CELL_SIZE > len(self.data): break
-            key = struct.unpack_from(self.KEY_FORMAT, self.data, offset)[0]
-            offset += self.KEY_SIZE
-            rid = struct.unpack_from(self.RID_FORMAT, self.data, offset)
-            offset += self.RID_SIZE
-            self.key_rid_pairs.append((key, rid))
+        # 读取 (键, RID) 对：整段单元区一次 iter_unpack
+        num_cells = min(self.num_keys, (len(self.data) - offset) // self.CELL_SIZE)
+        self.key_rid_pairs = [(key, (page_id, slot)) for key, page_id, slot in
+                              _LEAF_CELL.iter_unpack(memoryview(self.data)[offset:offset + num_cells * self.CELL_SIZE])]
 
     def serialize(self):
         """将内存中的数据结构序列化回页面的字节数据中。"""
@@ -192,36 +211,67 @@ class LeafPage(BPlusTreePage):
         offset = self.HEADER_SIZE
 
         # 写入兄弟指针
-        struct.pack_into(f'2{self.SIBLING_POINTER_FORMAT}', self.data, offset, self.prev_page_id, self.next_page_id)
+        _SIBLING_POINTERS.pack_into(self.data, offset, self.prev_page_id, self.next_page_id)
         offset += 2 * self.SIBLING_POINTER_SIZE
 
-        # 写入 (键, RID) 对
-        for key, rid in self.key_rid_pairs:
-            struct.pack_into(self.KEY_FORMAT, self.data, offset, key)
-            offset += self.KEY_SIZE
-            struct.pack_into(self.RID_FORMAT, self.data, offset, *rid)
-            offset += self.RID_SIZE
+        # 写入 (键, RID) 对：直接打包进页面缓冲区，不产生中间的 bytes 对象
+        data, pack_into, cell_size = self.data, _LEAF_CELL.pack_into, self.CELL_SIZE
+        for key, (page_id, slot) in self.key_rid_pairs:
+            pack_into(data, offset, key, page_id, slot)
+            offset += cell_size
 
     def lookup(self, key) -> tuple | None:
         """在叶子节点中查找键，如果找到则返回对应的 RID。"""
-        keys = [pair[0] for pair in self.key_rid_pairs]
-        # 二分查找定位
-        idx = bisect.bisect_left(keys, key)
+        # 以 (key,) 为探针直接在 (键, RID) 列表上二分：它排在所有键相同的条目之前，无需先取出键列表
+        pairs = self.key_rid_pairs
+        idx = bisect.bisect_left(pairs, (key,))
         # 确认是否精确匹配
-        if idx < len(keys) and keys[idx] == key:
-            return self.key_rid_pairs[idx][1]
+        if idx < len(pairs) and pairs[idx][0] == key:
+            return pairs[idx][1]
+        return None
+
+    @classmethod
+    def cell_offset_in_page(cls, data: bytearray, key) -> int | None:
+        """直接在页面字节上二分查找键，返回其所在单元在页面中的偏移量；键不存在时返回 None。"""
+        num_keys = min(_HEADER.unpack_from(data)[1], (len(data) - cls.LEAF_HEADER_SIZE) // cls.CELL_SIZE)
+        lo, hi = 0, num_keys
+        while lo < hi:
+            mid = (lo + hi) // 2
+            cell = cls.LEAF_HEADER_SIZE + mid * cls.CELL_SIZE
+            if data[cell:cell + cls.KEY_SIZE] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < num_keys:
+            cell = cls.LEAF_HEADER_SIZE + lo * cls.CELL_SIZE
+            if data[cell:cell + cls.KEY_SIZE] == key:
+                return cell
         return None
 
+    @classmethod
+    def lookup_in_page(cls, data: bytearray, key) -> tuple | None:
+        """与 lookup 结果相同，但直接在页面字节上二分查找，不反序列化整个叶子。"""
+        cell = cls.cell_offset_in_page(data, key)
+        if cell is None:
+            return None
+        return _LEAF_CELL_RID.unpack_from(data, cell)
+
+    @classmethod
+    def rids_in_page(cls, data: bytearray) -> tuple:
+        """直接从页面字节中按键的顺序读出全部 RID 和后继页面ID，不构建 (键, RID) 列表。"""
+        num_keys = min(_HEADER.unpack_from(data)[1], (len(data) - cls.LEAF_HEADER_SIZE) // cls.CELL_SIZE)
+        next_page_id = _SIBLING_POINTERS.unpack_from(data, cls.HEADER_SIZE)[1]
+        cells = memoryview(data)[cls.LEAF_HEADER_SIZE:cls.LEAF_HEADER_SIZE + num_keys * cls.CELL_SIZE]
+        return list(_LEAF_CELL_RID.iter_unpack(cells)), next_page_id
+
     def is_full(self) -> bool:
         """检查页面是否已满。"""
         return self.get_num_keys() >= self.get_max_keys()
 
     def insert(self, key, rid: tuple):
         """在叶子节点中插入一个新的 (键, RID) 对，并保持有序。"""
-        new_pair = (key, rid)
-        keys = [pair[0] for pair in self.key_rid_pairs]
-        insert_idx = bisect.bisect_left(keys, key)
-        self.key_rid_pairs.insert(insert_idx, new_pair)
+        insert_idx = bisect.bisect_left(self.key_rid_pairs, (key,))
+        self.key_rid_pairs.insert(insert_idx, (key, rid))
         self.num_keys = len(self.key_rid_pairs)
 
     def get_max_keys(self) -> int:
@@ -230,10 +280,10 @@ class LeafPage(BPlusTreePage):
 
     def remove(self, key) -> bool:
         """根据键移除一个 (键, RID) 对。"""
-        keys = [pair[0] for pair in self.key_rid_pairs]
-        idx = bisect.bisect_left(keys, key)
-        if idx < len(keys) and keys[idx] == key:
-            self.key_rid_pairs.pop(idx)
+        pairs = self.key_rid_pairs
+        idx = bisect.bisect_left(pairs, (key,))
+        if idx < len(pairs) and pairs[idx][0] == key:
+            pairs.pop(idx)
             self.num_keys -= 1
             return True
         return False
@@ -251,6 +301,8 @@ class TransactionContext:
         self.tree = tree
         # 存储已加锁的页面包装器对象
         self.latched_pages_wrappers = []
+        # 已处理完毕、从栈中弹出但尚未解锁/解钉的页面（例如分裂后的子节点）
+        self.finished_pages_wrappers = []
         # 记录本次操作中新创建的页面ID，用于错误回滚
         self.newly_created_page_ids = set()
         # 记录本次操作中要删除的页面ID
@@ -260,6 +312,15 @@ class TransactionContext:
         """将一个已加锁的页面加入上下文管理。"""
         self.latched_pages_wrappers.append(page_wrapper)
 
+    def pop_latched_page(self):
+        """
+        从栈顶弹出一个已加锁的页面。该页面仍由上下文持有，
+        在 release_all_latches 时与其余页面一起作为脏页解钉并释放锁。
+        """
+        page_wrapper = self.latched_pages_wrappers.pop()
+        self.finished_pages_wrappers.append(page_wrapper)
+        return page_wrapper
+
     def release_all_latches(self, is_dirty_list=None, is_error: bool = False):
         """
         释放所有持有的页面锁（latch）并解钉（unpin）页面。
@@ -278,10 +339,16 @@ class TransactionContext:
             self.tree.bpm.unpin_page(page_id, is_dirty)
             self.tree._release_latch(page_id)
 
+        # 弹出的页面都已被修改，作为脏页解钉
+        for wrapper in reversed(self.finished_pages_wrappers):
+            self.tree.bpm.unpin_page(wrapper.page.page_id, True)
+            self.tree._release_latch(wrapper.page.page_id)
+        self.finished_pages_wrappers.clear()
+
         # 释放为新页面和已删除页面持有的锁
         for page_id in self.newly_created_page_ids: self.tree._release_latch(page_id)
+        # 被合并删除的页面，其锁已由持有它的一方（上面的页面列表或兄弟节点的处理逻辑）释放
         for page_id in self.deleted_page_ids:
-            self.tree._release_latch(page_id)
             if not is_error: self.tree.bpm.delete_page(page_id)
 
         # 清理上下文状态
@@ -335,6 +402,27 @@ class BPlusTree:
 
     def search(self, key) -> tuple | None:
         """从B+树中查找一个键，返回其对应的RID (线程安全)。"""
+        return self._visit_leaf(key, lambda data: (LeafPage.lookup_in_page(data, key), False))
+
+    def update(self, key, new_rid: tuple) -> bool:
+        """
+        将已有键对应的 RID 原地改为 new_rid (线程安全)，键不存在时返回 False。
+        只改写叶子中该键所在单元的 RID 部分：与先 delete 再 insert 相比只需下降一次，
+        也不会引起叶子的合并或分裂，适合键不变、只有行位置改变的情况（例如行被迁移到其他页）。
+        """
+        def rewrite(data):
+            cell = LeafPage.cell_offset_in_page(data, key)
+            if cell is None:
+                return False, False
+            _RID.pack_into(data, cell + LeafPage.KEY_SIZE, *new_rid)
+            return True, True
+        return bool(self._visit_leaf(key, rewrite))
+
+    def _visit_leaf(self, key, visit):
+        """
+        search / update 的实现部分：自根向下逐页加锁（同一时刻只锁住并钉住一个页面）下降到键所在的叶子，
+        在持有叶子的锁时调用 visit(页面数据)，它返回 (结果, 是否修改了页面)。树为空时返回 None。
+        """
         if self.root_page_id is None or self.root_page_id == INVALID_PAGE_ID:
             return None
 
@@ -349,13 +437,16 @@ class BPlusTree:
                 return None
 
             while True:
-                page_wrapper = BPlusTreePage(page_obj)
-                if page_wrapper.is_leaf:
-                    leaf_wrapper = LeafPage(page_obj)
-                    return leaf_wrapper.lookup(key)
+                # 直接在页面字节上二分，不构造完整的节点对象
+                if page_obj.data[0]:
+                    result, is_dirty = visit(page_obj.data)
+                    if is_dirty:
+                        self.bpm.unpin_page(current_page_id, is_dirty=True)
+                        self._release_latch(current_page_id)
+                        latch_held = False
+                    return result
                 else:
-                    internal_wrapper = InternalPage(page_obj)
-                    next_page_id = internal_wrapper.lookup(key)
+                    next_page_id = InternalPage.lookup_in_page(page_obj.data, key)
 
                     self.bpm.unpin_page(current_page_id, is_dirty=False)
                     self._release_latch(current_page_id)
@@ -377,6 +468,50 @@ class BPlusTree:
                 except (threading.ThreadError, RuntimeError):
                     pass
 
+    def iter_items(self):
+        """
+        沿叶子链按键的顺序产出全部 (键, RID)。
+        先沿最左指针下降到第一个叶子，之后只顺着后继指针移动。每次只锁住并钉住一个页面，
+        并且在复制出当前叶子的全部条目、释放页面之后才产出，因此遍历期间的并发修改可能不会被看到。
+        """
+        def read_leaf(page_obj):
+            leaf_wrapper = LeafPage(page_obj)
+            return leaf_wrapper.key_rid_pairs, leaf_wrapper.next_page_id
+        return self._iter_leaf_chain(read_leaf)
+
+    def iter_rids(self):
+        """与 iter_items 的遍历方式相同，但只按键的顺序产出 RID：每个叶子的 RID 由一次 iter_unpack 直接解出。"""
+        return self._iter_leaf_chain(lambda page_obj: LeafPage.rids_in_page(page_obj.data))
+
+    def _iter_leaf_chain(self, read_leaf):
+        """iter_items / iter_rids 的实现部分：read_leaf(页面) 返回 (该叶子要产出的条目, 后继页面ID)。"""
+        if self.root_page_id is None or self.root_page_id == INVALID_PAGE_ID:
+            return
+
+        current_page_id = self.root_page_id
+        while True:
+            self._acquire_latch(current_page_id)
+            try:
+                page_obj = self.bpm.fetch_page(current_page_id)
+                if not page_obj:
+                    raise RuntimeError(f"在遍历过程中无法获取页面 {current_page_id}。")
+                try:
+                    if page_obj.data[0]:
+                        pairs, next_page_id = read_leaf(page_obj)
+                    else:
+                        pairs, next_page_id = None, InternalPage(page_obj).pointers[0]
+                finally:
+                    self.bpm.unpin_page(current_page_id, is_dirty=False)
+            finally:
+                self._release_latch(current_page_id)
+
+            if pairs is not None:
+                yield from pairs
+                # 最后一个叶子的后继指针为 0（页面 0 是目录页，不会是叶子）
+                if next_page_id == 0 or next_page_id == INVALID_PAGE_ID:
+                    return
+            current_page_id = next_page_id
+
     def insert(self, key, rid: tuple) -> bool | None:
         """
         [DEADLOCK FIX & PK FIX] 修复了死锁和主键唯一性检查问题。
@@ -428,6 +563,164 @@ class BPlusTree:
             context.release_all_latches(is_error=True)
             return False
 
+    def insert_many(self, sorted_pairs: list) -> bool:
+        """
+        向一棵（可能非空的）树中批量插入按键递增排序的 (键, RID) 对。
+        每次从根下降到目标叶子后，把落在该叶子键范围内的一段连续键一次性合并进去，
+        直到叶子再插入就需要分裂为止；需要分裂的那个键退回到常规的 insert。
+        对自增主键这类总是追加在最右侧叶子的键，下降和序列化的次数从每键一次降为每个叶子一次。
+        与 insert 一致，已存在的键会被跳过。
+
+        Returns:
+            bool: 根节点是否改变。
+        """
+        root_changed = False
+        i = 0
+        while i < len(sorted_pairs):
+            if self.root_page_id is None or self.root_page_id == INVALID_PAGE_ID:
+                i, changed = i + 1, self.insert(*sorted_pairs[i])
+            else:
+                i, changed = self._insert_run_into_leaf(sorted_pairs, i)
+            root_changed = bool(changed) or root_changed
+        return root_changed
+
+    def _insert_run_into_leaf(self, sorted_pairs: list, start: int) -> tuple:
+        """
+        insert_many 的辅助方法：下降到 sorted_pairs[start] 所在的叶子，将其后仍属于该叶子键范围、
+        且不会导致叶子分裂的键合并进去。叶子已无空间时对该键调用 insert 完成分裂。
+        下降时采用与 search 相同的逐层加锁方式，合并只改动叶子本身，因此只需持有叶子的锁。
+
+        Returns:
+            tuple: (下一个待插入的下标, 根节点是否改变)
+        """
+        first_key = sorted_pairs[start][0]
+        upper_bound = None  # 目标叶子键范围的上界（不含）；None 表示最右侧叶子
+        current_page_id = self.root_page_id
+        self._acquire_latch(current_page_id)
+        page_obj = self.bpm.fetch_page(current_page_id)
+        if not page_obj:
+            self._release_latch(current_page_id)
+            raise RuntimeError(f"无法获取页面 {current_page_id}，缓冲池可能已满。")
+
+        run = []
+        try:
+            while not BPlusTreePage(page_obj).is_leaf:
+                internal_wrapper = InternalPage(page_obj)
+                idx = bisect.bisect_right(internal_wrapper.keys, first_key)
+                if idx < len(internal_wrapper.keys):
+                    upper_bound = internal_wrapper.keys[idx]
+                next_page_id = internal_wrapper.pointers[idx]
+
+                self._acquire_latch(next_page_id)
+                next_page_obj = self.bpm.fetch_page(next_page_id)
+                self.bpm.unpin_page(current_page_id, is_dirty=False)
+                self._release_latch(current_page_id)
+                current_page_id = next_page_id
+                if not next_page_obj:
+                    self._release_latch(current_page_id)
+                    current_page_id = None
+                    raise RuntimeError(f"在遍历过程中无法获取页面 {next_page_id}。")
+                page_obj = next_page_obj
+
+            leaf_wrapper = LeafPage(page_obj)
+            # 插入后键数达到上限会触发分裂，因此最多填到 max_keys - 1
+            room = leaf_wrapper.get_max_keys() - 1 - leaf_wrapper.get_num_keys()
+            existing_keys = {pair[0] for pair in leaf_wrapper.key_rid_pairs}
+            end = start
+            while end < len(sorted_pairs) and len(run) < room:
+                key = sorted_pairs[end][0]
+                if upper_bound is not None and key >= upper_bound:
+                    break
+                if key not in existing_keys:
+                    run.append(sorted_pairs[end])
+                end += 1
+
+            if run:
+                # 两段各自有序，Timsort 在这种情况下接近线性
+                leaf_wrapper.key_rid_pairs = sorted(leaf_wrapper.key_rid_pairs + run, key=lambda pair: pair[0])
+                leaf_wrapper.serialize()
+        finally:
+            if current_page_id is not None:
+                self.bpm.unpin_page(current_page_id, is_dirty=bool(run))
+                self._release_latch(current_page_id)
+
+        if end == start:
+            # 叶子已满：交给常规插入完成分裂
+            return start + 1, self.insert(*sorted_pairs[start])
+        return end, False
+
+    def bulk_load(self, sorted_pairs: list, fill_factor: float = 0.75) -> bool:
+        """
+        自底向上批量构建一棵空树：按 fill_factor 依次填满叶子页并串好兄弟指针，
+        再逐层用每个子节点的最小键构建内部节点，直到只剩一个根。
+        每个页面只写一次，避免逐键插入时的反复下降和分裂。
+        sorted_pairs 必须按键严格递增；调用方需保证构建期间没有其他线程访问这棵树。
+
+        Returns:
+            bool: 根节点是否改变。
+        """
+        if self.root_page_id is not None and self.root_page_id != INVALID_PAGE_ID:
+            raise ValueError("只能对空树进行批量构建。")
+        if not sorted_pairs:
+            return False
+
+        page_size = self.bpm.disk_manager.page_size
+        # 新页面的键数必须小于上限，否则下一次插入会立即触发分裂
+        leaf_max_keys = (page_size - LeafPage.LEAF_HEADER_SIZE) // LeafPage.CELL_SIZE
+        leaf_capacity = max(1, min(leaf_max_keys - 1, int(leaf_max_keys * fill_factor)))
+        internal_max_keys = (page_size - BPlusTreePage.HEADER_SIZE - InternalPage.POINTER_SIZE) // InternalPage.CELL_SIZE
+        internal_capacity = max(2, min(internal_max_keys, int((internal_max_keys + 1) * fill_factor)))
+
+        # 1. 叶子层：前一个叶子保持钉住，直到下一个叶子分配出来后再写入其后继指针
+        level = []  # [(该子树的最小键, page_id)]
+        prev_leaf = None
+        for chunk in self._even_chunks(sorted_pairs, leaf_capacity):
+            page_obj = self.bpm.new_page()
+            if not page_obj:
+                raise MemoryError("缓冲池已满，无法为批量构建创建叶子页面。")
+            leaf = LeafPage(page_obj)
+            leaf.key_rid_pairs = list(chunk)
+            leaf.prev_page_id = prev_leaf.page.page_id if prev_leaf else 0
+            leaf.next_page_id = 0
+            if prev_leaf:
+                prev_leaf.next_page_id = page_obj.page_id
+                prev_leaf.serialize()
+                self.bpm.unpin_page(prev_leaf.page.page_id, is_dirty=True)
+            level.append((chunk[0][0], page_obj.page_id))
+            prev_leaf = leaf
+        prev_leaf.serialize()
+        self.bpm.unpin_page(prev_leaf.page.page_id, is_dirty=True)
+
+        # 2. 内部层：逐层向上构建，直到只剩一个节点
+        while len(level) > 1:
+            next_level = []
+            for children in self._even_chunks(level, internal_capacity):
+                page_obj = self.bpm.new_page()
+                if not page_obj:
+                    raise MemoryError("缓冲池已满，无法为批量构建创建内部页面。")
+                node = InternalPage(page_obj)
+                node.keys = [child_key for child_key, _ in children[1:]]
+                node.pointers = [child_pid for _, child_pid in children]
+                node.serialize()
+                self.bpm.unpin_page(page_obj.page_id, is_dirty=True)
+                next_level.append((children[0][0], page_obj.page_id))
+            level = next_level
+
+        self.root_page_id = level[0][1]
+        return True
+
+    @staticmethod
+    def _even_chunks(items: list, capacity: int) -> list:
+        """将 items 均匀地切分为若干块，每块不超过 capacity，避免最后一块过小。"""
+        num_chunks = -(-len(items) // capacity)
+        base, extra = divmod(len(items), num_chunks)
+        chunks, start = [], 0
+        for i in range(num_chunks):
+            end = start + base + (1 if i < extra else 0)
+            chunks.append(items[start:end])
+            start = end
+        return chunks
+
     def delete(self, key) -> bool:
         """从B+树中删除一个键及其关联的值。"""
         context = TransactionContext(self)
@@ -614,7 +907,7 @@ class BPlusTree:
     def _insert_into_parent(self, key, right_child_pid: int, context: TransactionContext) -> bool:
         """递归地将分裂产生的键和指针插入到父节点中。"""
         # 从上下文中弹出子节点，栈顶即为父节点
-        popped_child_wrapper = context.latched_pages_wrappers.pop()
+        popped_child_wrapper = context.pop_latched_page()
         left_child_pid = popped_child_wrapper.page.page_id
 
         # Case 1: 如果栈为空，说明原节点是根节点，需要创建一个新的根
@@ -679,7 +972,7 @@ class BPlusTree:
             return
 
         # 获取父节点和当前节点在父节点中的位置
-        context.latched_pages_wrappers.pop()
+        context.pop_latched_page()
         parent_node = InternalPage(context.latched_pages_wrappers[-1].page)
         child_index = parent_node.pointers.index(node.page.page_id)
 
@@ -1,8 +1,9 @@
 import json
+import sys
 from typing import Dict, Any, Tuple, Optional
 from sql.ast import DataType, ColumnConstraint, ColumnDefinition
 
-from engine.constants import PAGE_SIZE
+from engine.constants import PAGE_SIZE, ZERO_PAGE
 
 
 class CatalogPage:
@@ -12,9 +13,14 @@ class CatalogPage:
     包括堆页面、Schema和所有索引信息。
     """
 
+    # 索引键编码格式的版本号：
+    # 1 - INT 键为大端有符号整数（负数排在正数之后）；2 - INT 键加偏置后按大端无符号编码，字节序即数值序
+    KEY_FORMAT_VERSION = 2
+
     def __init__(self):
         # 存储结构: { table_name: {'heap_root_page_id': int, 'schema': Dict, 'indexes': Dict} }
         self.tables: Dict[str, Dict[str, Any]] = {}
+        self.key_format_version = CatalogPage.KEY_FORMAT_VERSION
 
     def _serialize_schema(self, schema: Dict[str, ColumnDefinition]) -> Dict[str, Any]:
         """将 schema 对象（包含 ColumnDefinition 实例）序列化为可转为 JSON 的字典。"""
@@ -53,6 +59,17 @@ class CatalogPage:
         将整个 CatalogPage 对象序列化为字节，以便写入磁盘。
         此方法只写入新的多索引格式。
         """
+        data = bytearray(PAGE_SIZE)
+        self.serialize_into(data)
+        return bytes(data)
+
+    def encode(self) -> bytes:
+        """
+        将目录编码为写入页面的 JSON 字节（不含末尾的零填充）。
+
+        Raises:
+            RuntimeError: 编码结果超出一页的大小。
+        """
         data_to_serialize = {
             'tables': {
                 name: {
@@ -62,12 +79,28 @@ class CatalogPage:
                 }
                 for name, data in self.tables.items()
             },
+            'key_format_version': self.key_format_version,
         }
         serialized_data = json.dumps(data_to_serialize).encode('utf-8')
-        padding_size = PAGE_SIZE - len(serialized_data)
-        if padding_size < 0:
+        if len(serialized_data) > PAGE_SIZE:
             raise RuntimeError(f"序列化后的目录页大小 ({len(serialized_data)}) 超出页面限制 ({PAGE_SIZE})")
-        return serialized_data + b'\0' * padding_size
+        return serialized_data
+
+    def serialize_into(self, buffer: bytearray, encoded: Optional[bytes] = None) -> int:
+        """
+        将 CatalogPage 直接序列化到调用方提供的页面缓冲区（通常是缓冲池帧）中，其余部分清零，
+        省去先生成整页字节再复制的开销。
+        给出 encoded（encode 的结果）时直接写入它，不再重新编码。
+
+        Returns:
+            int: 写入的有效字节数。
+        """
+        serialized_data = self.encode() if encoded is None else encoded
+        size = len(serialized_data)
+        view = memoryview(buffer)
+        view[:size] = serialized_data
+        view[size:PAGE_SIZE] = memoryview(ZERO_PAGE)[size:]
+        return size
 
     @staticmethod
     def deserialize(data: bytes):
@@ -94,6 +127,8 @@ class CatalogPage:
                 }
 
             catalog_page.tables = deserialized_tables
+            # 没有版本号的目录页来自旧版本，其中的索引使用第 1 版键编码
+            catalog_page.key_format_version = loaded_data.get('key_format_version', 1)
         except (json.JSONDecodeError, UnicodeDecodeError, KeyError) as e:
             # 增加 KeyError 捕获，以防遇到格式不完整的旧数据
             print(f"警告: 加载目录页失败，数据格式可能不正确或已损坏 ({e})。将使用空目录。")
@@ -116,7 +151,7 @@ class CatalogPage:
                 except ValueError:
                     constraints.append((c, val))
 
-            deserialized_schema[col_name] = ColumnDefinition(
+            deserialized_schema[sys.intern(col_name)] = ColumnDefinition(
                 name=col_def_dict['name'], data_type=data_type, constraints=constraints,
                 default_value=col_def_dict.get('default_value'), length=col_def_dict.get('length'),
                 precision=col_def_dict.get('precision'), scale=col_def_dict.get('scale')
@@ -1,2 +1,4 @@
 PAGE_SIZE = 4096
-ROW_LENGTH_PREFIX_SIZE = 4
\ No newline at end of file
+ROW_LENGTH_PREFIX_SIZE = 4
+# 全零的整页，用于就地清零页面缓冲区中未使用的部分
+ZERO_PAGE = bytes(PAGE_SIZE)
@@ -1,16 +1,83 @@
 # data_page.py
-from typing import List, Tuple, Optional
+from typing import Iterator, List, Tuple, Optional
+import struct
 
 from engine.constants import PAGE_SIZE, ROW_LENGTH_PREFIX_SIZE
 
+# 记录的长度前缀：4 字节有符号小端整数，负数表示记录已被删除
+_RECORD_LENGTH = struct.Struct('<i')
+
+# 页尾元数据：[空闲空间指针(2字节)][记录数(2字节)][MAGIC(4字节)]，位于页面最后 8 字节。
+# 没有页尾的旧格式页面在加载时按记录长度遍历重建这些信息。
+_TRAILER = struct.Struct('<HH4s')
+_TRAILER_MAGIC = b'DPT1'
+_TRAILER_OFFSET = PAGE_SIZE - _TRAILER.size
+
 
 class DataPage:
     """数据页（DataPage），负责存储表的实际行记录。"""
 
-    def __init__(self, page_id: int, data: bytes = b''):
+    def __init__(self, page_id: int, data: bytes = b'', copy: bool = True):
+        """
+        copy 为 False 时直接在传入的 bytearray（通常是缓冲池帧）上读写，不复制整页，
+        修改会立即反映到该缓冲区中；调用方需保证在此期间页面保持钉住。
+        """
         self.page_id = page_id
-        self.data = bytearray(data) if data else bytearray(PAGE_SIZE)
-        self.free_space_pointer = self._calculate_free_space_pointer()
+        if not data:
+            self.data = bytearray(PAGE_SIZE)
+        elif copy or not isinstance(data, bytearray):
+            self.data = bytearray(data)
+        else:
+            self.data = data
+        # 记录区的上界；带页尾的页面要为页尾留出空间
+        self.capacity = _TRAILER_OFFSET
+        self.has_trailer = True
+
+        free_space_pointer, record_count, magic = _TRAILER.unpack_from(self.data, _TRAILER_OFFSET)
+        if magic == _TRAILER_MAGIC and free_space_pointer <= _TRAILER_OFFSET:
+            # 页尾有效：直接读取，无需遍历整页记录
+            self.free_space_pointer = free_space_pointer
+            self.record_count = record_count
+        else:
+            # 旧格式页面：遍历一次重建元数据；若记录区没有占用页尾位置，则从此改用带页尾的格式
+            self.free_space_pointer = self._calculate_free_space_pointer()
+            self.record_count = sum(1 for _ in self._iter_record_offsets())
+            if self.free_space_pointer <= _TRAILER_OFFSET:
+                self._write_trailer()
+            else:
+                self.capacity = PAGE_SIZE
+                self.has_trailer = False
+
+    def _write_trailer(self):
+        """将空闲空间指针和记录数写入页尾。"""
+        if self.has_trailer:
+            _TRAILER.pack_into(self.data, _TRAILER_OFFSET, self.free_space_pointer, self.record_count, _TRAILER_MAGIC)
+
+    def _truncate_at(self, offset: int):
+        """
+        将记录区截断到 offset：offset 之后（原为最后一条记录）的空间直接退回页尾的空闲空间，
+        而不是留下一条已删除记录，之后的插入从这里追加，扫描也不再经过它。
+        写入长度为 0 的前缀，使没有页尾的旧格式页面重建元数据时同样在此停止。
+        只影响末尾，其余记录的偏移量（RID）不变。
+        """
+        if offset + ROW_LENGTH_PREFIX_SIZE <= self.capacity:
+            _RECORD_LENGTH.pack_into(self.data, offset, 0)
+        self.free_space_pointer = offset
+        self._write_trailer()
+
+    def _iter_record_offsets(self) -> Iterator[int]:
+        """按长度前缀依次产出记录区内每条记录（包括已删除记录）的偏移量。"""
+        offset = 0
+        while offset + ROW_LENGTH_PREFIX_SIZE <= self.free_space_pointer:
+            record_length = _RECORD_LENGTH.unpack_from(self.data, offset)[0]
+            if record_length == 0:
+                break
+            yield offset
+            offset += abs(record_length)
+
+    def get_record_count(self) -> int:
+        """返回页面中的记录数（包括已删除的记录）。"""
+        return self.record_count
 
     def _calculate_free_space_pointer(self) -> int:
         """
@@ -24,11 +91,8 @@ class DataPage:
             if offset + ROW_LENGTH_PREFIX_SIZE > PAGE_SIZE:
                 break
 
-            try:
-                # 使用 signed=True 来正确读取正负长度
-                record_len = int.from_bytes(self.data[offset:offset + ROW_LENGTH_PREFIX_SIZE], "little", signed=True)
-            except IndexError:
-                break
+            # 有符号读取，以正确处理正负长度
+            record_len = _RECORD_LENGTH.unpack_from(self.data, offset)[0]
 
             # 长度为0表示数据结束
             if record_len == 0:
@@ -45,7 +109,7 @@ class DataPage:
 
     def get_free_space(self) -> int:
         """返回页面中剩余的可用空间大小。"""
-        return PAGE_SIZE - self.free_space_pointer
+        return self.capacity - self.free_space_pointer
 
     def insert_record(self, record_data: bytes) -> int:
         """在页面末尾插入一条新记录。"""
@@ -54,6 +118,69 @@ class DataPage:
         offset = self.free_space_pointer
         self.data[offset:offset + len(record_data)] = record_data
         self.free_space_pointer += len(record_data)
+        self.record_count += 1
+        self._write_trailer()
+        return offset
+
+    def insert_row(self, row_data: bytes) -> int:
+        """
+        在页面末尾插入一行（不含长度前缀），由本方法写入长度前缀；末尾空间不足时复用已删除记录的空间。
+        前缀通过 pack_into 直接写入页面缓冲区，行数据通过 memoryview 切片赋值写入，
+        调用方无需先拼接出完整记录。
+        """
+        # 热路径：页面缓冲区和空闲指针只读取一次，之后都用局部变量
+        data = self.data
+        offset = self.free_space_pointer
+        end = offset + ROW_LENGTH_PREFIX_SIZE + len(row_data)
+        if end > self.capacity:
+            # 末尾放不下时，尝试复用一条已删除记录的空间
+            slot = self.find_free_slot(ROW_LENGTH_PREFIX_SIZE + len(row_data))
+            if slot is None:
+                raise ValueError("页面空间不足，无法插入记录。")
+            return self._insert_into_slot(slot, row_data)
+        _RECORD_LENGTH.pack_into(data, offset, end - offset)
+        memoryview(data)[offset + ROW_LENGTH_PREFIX_SIZE:end] = row_data
+        self.free_space_pointer = end
+        self.record_count += 1
+        if self.has_trailer:
+            _TRAILER.pack_into(data, _TRAILER_OFFSET, end, self.record_count, _TRAILER_MAGIC)
+        return offset
+
+    def find_free_slot(self, record_length: int) -> Optional[int]:
+        """
+        首次适配：返回第一条长度不小于 record_length 的已删除记录的偏移量，没有时返回 None。
+        已删除记录保留了原长度（长度前缀取反），沿长度前缀遍历即可找到，无需额外的空闲链表。
+        """
+        data = self.data
+        for offset in self._iter_record_offsets():
+            if -_RECORD_LENGTH.unpack_from(data, offset)[0] >= record_length:
+                return offset
+        return None
+
+    def can_insert(self, record_length: int) -> bool:
+        """判断一条长度为 record_length（含长度前缀）的记录能否写入本页：末尾空间或已删除记录均可。"""
+        return self.get_free_space() >= record_length or self.find_free_slot(record_length) is not None
+
+    def _insert_into_slot(self, offset: int, row_data: bytes) -> int:
+        """
+        将一行写入 offset 处的已删除记录。
+        剩余空间足够放下长度前缀时，将其切分为一条新的已删除记录，留给之后的插入；
+        否则整条记录归新行所有，剩余部分作为尾部填充（与 update_record 原地缩短时相同）。
+        """
+        data = self.data
+        slot_length = -_RECORD_LENGTH.unpack_from(data, offset)[0]
+        record_length = ROW_LENGTH_PREFIX_SIZE + len(row_data)
+        gap = slot_length - record_length
+        end = offset + record_length
+        memoryview(data)[offset + ROW_LENGTH_PREFIX_SIZE:end] = row_data
+        if gap >= ROW_LENGTH_PREFIX_SIZE:
+            _RECORD_LENGTH.pack_into(data, offset, record_length)
+            _RECORD_LENGTH.pack_into(data, end, -gap)
+            self.record_count += 1
+            self._write_trailer()
+        else:
+            _RECORD_LENGTH.pack_into(data, offset, slot_length)
+            data[end:offset + slot_length] = bytes(gap)
         return offset
 
     def update_record(self, offset: int, new_record: bytes) -> Tuple[int, bool]:
@@ -66,23 +193,18 @@ class DataPage:
         if offset < 0 or offset + ROW_LENGTH_PREFIX_SIZE > len(self.data):
             raise IndexError("无效的记录偏移量。")
 
-        existing_total_length = int.from_bytes(self.data[offset: offset + ROW_LENGTH_PREFIX_SIZE], "little",
-                                               signed=True)
+        existing_total_length = _RECORD_LENGTH.unpack_from(self.data, offset)[0]
         if existing_total_length <= 0:
             raise ValueError("不能更新一个已经被删除的记录。")
 
         if len(new_record) <= existing_total_length:
-            # 原地更新
-            self.data[offset:offset + len(new_record)] = new_record
-            # 如果新记录比旧的短，用空字节填充剩余部分
-            zero_start = offset + len(new_record)
-            zero_end = offset + existing_total_length
-            if zero_end > zero_start:
-                self.data[zero_start:zero_end] = b'\0' * (zero_end - zero_start)
-            return offset, False
-
-        # 如果新记录更长，且空间不足
-        if self.get_free_space() < len(new_record):
+            return self.update_row(offset, memoryview(new_record)[ROW_LENGTH_PREFIX_SIZE:])
+
+        # 如果新记录更长，且空间不足（最后一条记录删除后，其空间直接退回页尾）
+        available = self.get_free_space()
+        if offset + existing_total_length == self.free_space_pointer:
+            available += existing_total_length
+        if available < len(new_record):
             raise ValueError("页面空间不足，无法更新记录。")
 
         # 逻辑删除旧记录，并在末尾插入新记录
@@ -90,6 +212,49 @@ class DataPage:
         new_offset = self.insert_record(new_record)
         return new_offset, True
 
+    def update_row(self, offset: int, row_data: bytes) -> Tuple[int, bool]:
+        """
+        用一行新数据（不含长度前缀）更新指定偏移量的记录，返回值与 update_record 相同。
+        新行不长于旧行时（最常见的情况）直接在页面上写入长度前缀和行数据，无需先拼接出完整记录。
+        """
+        if offset < 0 or offset + ROW_LENGTH_PREFIX_SIZE > len(self.data):
+            raise IndexError("无效的记录偏移量。")
+
+        data = self.data
+        existing_total_length = _RECORD_LENGTH.unpack_from(data, offset)[0]
+        new_length = ROW_LENGTH_PREFIX_SIZE + len(row_data)
+        if existing_total_length <= 0:
+            raise ValueError("不能更新一个已经被删除的记录。")
+        if new_length > existing_total_length:
+            # 与 update_record 相同：逻辑删除旧记录，在页面末尾写入新行（由 insert_row 直接写入页面）；
+            # 旧记录是最后一条时，删除后新行就写在原位置，RID 不变
+            available = self.get_free_space()
+            if offset + existing_total_length == self.free_space_pointer:
+                available += existing_total_length
+            if available < new_length:
+                raise ValueError("页面空间不足，无法更新记录。")
+            self.delete_record(offset)
+            return self.insert_row(row_data), True
+
+        # 原地更新
+        memoryview(data)[offset + ROW_LENGTH_PREFIX_SIZE:offset + new_length] = row_data
+        # 新记录比旧的短时，剩余部分不能留成全零：长度为 0 会被扫描视为数据结束，导致其后的记录丢失。
+        # 空隙足够放下长度前缀时，将其标记为一条已删除的记录；否则保留旧长度，把空隙作为本记录的尾部填充。
+        gap = existing_total_length - new_length
+        if gap > 0 and offset + existing_total_length == self.free_space_pointer:
+            # 最后一条记录缩短：空隙直接退回页尾的空闲空间
+            _RECORD_LENGTH.pack_into(data, offset, new_length)
+            self._truncate_at(offset + new_length)
+        elif gap >= ROW_LENGTH_PREFIX_SIZE:
+            # 已删除记录的内容不会再被读取（与 delete_record 相同），只需写入取反的长度前缀
+            _RECORD_LENGTH.pack_into(data, offset, new_length)
+            _RECORD_LENGTH.pack_into(data, offset + new_length, -gap)
+            self.record_count += 1
+            self._write_trailer()
+        elif gap > 0:
+            data[offset + new_length:offset + existing_total_length] = bytes(gap)
+        return offset, False
+
     def get_data(self) -> bytes:
         """返回页面的字节数据。"""
         return bytes(self.data)
@@ -105,12 +270,8 @@ class DataPage:
             if current_offset + ROW_LENGTH_PREFIX_SIZE > self.free_space_pointer:
                 break
 
-            try:
-                # 使用 signed=True 来读取可能为负的长度
-                record_length = int.from_bytes(self.data[current_offset: current_offset + ROW_LENGTH_PREFIX_SIZE],
-                                               "little", signed=True)
-            except IndexError:
-                break
+            # 有符号读取可能为负的长度
+            record_length = _RECORD_LENGTH.unpack_from(self.data, current_offset)[0]
 
             # 如果长度为0，说明可能到了数据的末尾或者是一片未初始化的区域，停止扫描
             if record_length == 0:
@@ -133,11 +294,45 @@ class DataPage:
 
         return records
 
+    def iter_rows(self) -> Iterator[Tuple[int, memoryview]]:
+        """
+        逐条产出有效记录的 (偏移量, 行数据)，行数据不含长度前缀。
+        与 get_all_records 的遍历规则相同，供全表扫描使用。
+        行数据是本页面数据上的 memoryview 切片（不复制）；DataPage 持有的是页面的私有副本，
+        因此在不修改本页面的前提下，切片在缓冲池帧被复用后依然有效。
+        """
+        view = memoryview(self.data)
+        end = self.free_space_pointer
+        current_offset = 0
+        while current_offset + ROW_LENGTH_PREFIX_SIZE <= end:
+            record_length = _RECORD_LENGTH.unpack_from(view, current_offset)[0]
+            if record_length == 0:
+                break
+            record_end = current_offset + abs(record_length)
+            if record_end > end:
+                break
+            if record_length > 0:
+                yield current_offset, view[current_offset + ROW_LENGTH_PREFIX_SIZE:record_end]
+            current_offset = record_end
+
+    @staticmethod
+    def read_record(data: bytearray, offset: int) -> Optional[bytes]:
+        """
+        直接从页面字节中读取指定偏移量处一条有效记录的行数据（不含长度前缀）。
+        与 get_record 不同，无需先构造 DataPage 复制整页，只复制行数据本身。
+        """
+        if offset < 0 or offset + ROW_LENGTH_PREFIX_SIZE > len(data):
+            return None
+        record_length = _RECORD_LENGTH.unpack_from(data, offset)[0]
+        if record_length <= ROW_LENGTH_PREFIX_SIZE or offset + record_length > len(data):
+            return None
+        return bytes(memoryview(data)[offset + ROW_LENGTH_PREFIX_SIZE:offset + record_length])
+
     def get_record(self, offset: int) -> Optional[bytes]:
         """获取指定偏移量的单条记录。"""
         if offset < 0 or offset + ROW_LENGTH_PREFIX_SIZE > len(self.data):
             return None
-        record_length = int.from_bytes(self.data[offset:offset + ROW_LENGTH_PREFIX_SIZE], "little", signed=True)
+        record_length = _RECORD_LENGTH.unpack_from(self.data, offset)[0]
         # 长度为正才有效
         if record_length <= 0:
             return None
@@ -151,15 +346,20 @@ class DataPage:
         if offset < 0 or offset + ROW_LENGTH_PREFIX_SIZE > len(self.data):
             return False
 
-        old_record_length = int.from_bytes(self.data[offset:offset + ROW_LENGTH_PREFIX_SIZE], "little", signed=True)
+        old_record_length = _RECORD_LENGTH.unpack_from(self.data, offset)[0]
 
         # 如果记录已经被删除 (长度为负或0)，则无需操作
         if old_record_length <= 0:
             return True
 
+        if offset + old_record_length == self.free_space_pointer:
+            # 删除的是最后一条记录：不留已删除记录，直接截断记录区
+            self.record_count -= 1
+            self._truncate_at(offset)
+            return True
+
         # 将长度取反并写回
-        deleted_length_bytes = (-old_record_length).to_bytes(ROW_LENGTH_PREFIX_SIZE, "little", signed=True)
-        self.data[offset:offset + ROW_LENGTH_PREFIX_SIZE] = deleted_length_bytes
+        _RECORD_LENGTH.pack_into(self.data, offset, -old_record_length)
 
         return True
 
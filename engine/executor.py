@@ -154,7 +154,7 @@ class Executor:
         return delete_op.execute()
 
     def _execute_seq_scan(self, op: SeqScan) -> List[Any]:
-        seq_scan_op = SeqScanOperator(op.table_name, self.storage_engine)
+        seq_scan_op = SeqScanOperator(op.table_name, self.storage_engine, op.lazy)
         return seq_scan_op.execute()
 
     def _execute_filter(self, op: Filter) -> List[Any]:
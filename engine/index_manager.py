@@ -1,4 +1,8 @@
-from typing import Dict, Any, Optional, List, Tuple, TYPE_CHECKING
+from collections import OrderedDict
+from heapq import merge
+from itertools import islice
+from operator import itemgetter
+from typing import Callable, Dict, Any, Optional, List, Tuple, TYPE_CHECKING
 
 from engine.b_plus_tree import BPlusTree, INVALID_PAGE_ID
 from engine.exceptions import PrimaryKeyViolationError, UniquenessViolationError
@@ -15,7 +19,13 @@ class IndexManager:
     它封装了索引的创建、加载和维护逻辑。
     """
 
-    def __init__(self, table_name: str, storage_engine: 'StorageEngine'):
+    def __init__(self, table_name: str, storage_engine: 'StorageEngine', pk_lookup_cache_size: int = 0):
+        """
+        Args:
+            table_name (str): 索引所属的表名。
+            storage_engine (StorageEngine): 所属的存储引擎。
+            pk_lookup_cache_size (int): 主键点查缓存最多保存多少个键（见 search），为 0 时禁用。
+        """
         self.table_name = table_name
         self.storage_engine = storage_engine
         self.bpm = storage_engine.bpm
@@ -23,8 +33,40 @@ class IndexManager:
         # 注意：当前设计一个索引只对应一列，未来可扩展为多列
         self.column_to_index: Dict[str, str] = {}
         self.unique_indexes: Dict[str, bool] = {}
+        # 列名 -> (索引键编码函数, 是否主键)，首次使用时根据表结构生成
+        self._key_encoders: Dict[str, Tuple[Callable[[Any], bytes], bool]] = {}
+        # 逐行维护索引时使用的 (列名, B+树, 键编码函数, 是否主键, 是否唯一) 列表，见 _get_index_entries
+        self._index_entries: Optional[List[Tuple[str, BPlusTree, Callable[[Any], bytes], bool, bool]]] = None
+        # 主键点查缓存：主键索引键 -> RID，按最近使用的顺序淘汰，见 search
+        self.pk_lookup_cache_size = pk_lookup_cache_size
+        self._pk_rids: 'OrderedDict[bytes, Tuple[int, int]]' = OrderedDict()
         self._load_indexes()
 
+    def _get_key_encoder(self, col_name: str) -> Tuple[Callable[[Any], bytes], bool]:
+        """获取（并缓存）某一列的索引键编码函数以及该列是否为主键。"""
+        cached = self._key_encoders.get(col_name)
+        if cached is None:
+            col_def = self.storage_engine.catalog_page.get_table_metadata(self.table_name)['schema'][col_name]
+            is_pk = any(c[0] == ColumnConstraint.PRIMARY_KEY for c in col_def.constraints)
+            cached = (self.storage_engine.get_key_encoder(col_def.data_type), is_pk)
+            self._key_encoders[col_name] = cached
+        return cached
+
+    def _get_index_entries(self) -> List[Tuple[str, BPlusTree, Callable[[Any], bytes], bool, bool]]:
+        """
+        获取（并缓存）该表每个索引的 (列名, B+树, 键编码函数, 是否主键, 是否唯一)。
+        插入、删除、更新每一行都要遍历全部索引，预先解析好这些信息可以省去每行每个索引上的多次字典查找；
+        索引被创建、删除或重建时缓存失效。
+        """
+        if self._index_entries is None:
+            entries = []
+            for col_name, index_name in self.column_to_index.items():
+                encode_key, is_pk = self._get_key_encoder(col_name)
+                entries.append((col_name, self.indexes[index_name], encode_key, is_pk,
+                                is_pk or self.unique_indexes.get(index_name, False)))
+            self._index_entries = entries
+        return self._index_entries
+
     def _load_indexes(self):
         """从目录中加载该表的所有索引信息。"""
         table_meta = self.storage_engine.catalog_page.get_table_metadata(self.table_name)
@@ -69,6 +111,8 @@ class IndexManager:
         self.indexes[index_name] = new_b_tree
         self.column_to_index[column_name] = index_name
         self.unique_indexes[index_name] = is_unique
+        self._index_entries = None
+        self._pk_rids.clear()
 
         table_meta = self.storage_engine.catalog_page.get_table_metadata(self.table_name)
         if 'indexes' not in table_meta:
@@ -110,6 +154,26 @@ class IndexManager:
                 break
         if col_to_remove:
             del self.column_to_index[col_to_remove]
+        self._index_entries = None
+        self._pk_rids.clear()
+
+    def rebuild_index(self, index_name: str):
+        """
+        丢弃索引现有的 B+ 树，按当前的键编码从表数据自底向上重新构建（见 _populate_index）。
+        与 drop_index 一样，旧树占用的页面不做回收。
+        """
+        column_name = next((col for col, idx in self.column_to_index.items() if idx == index_name), None)
+        if column_name is None:
+            raise ValueError(f"索引 '{index_name}' 在表 '{self.table_name}' 中不存在。")
+
+        new_b_tree = BPlusTree(self.bpm, INVALID_PAGE_ID)
+        self.indexes[index_name] = new_b_tree
+        self._index_entries = None
+        self._pk_rids.clear()
+        table_meta = self.storage_engine.catalog_page.get_table_metadata(self.table_name)
+        table_meta['indexes'][index_name]['root_page_id'] = INVALID_PAGE_ID
+        self._populate_index(new_b_tree, column_name, index_name)
+        self.storage_engine._flush_catalog_page()
 
     def _populate_index(self, b_tree: BPlusTree, column_name: str, index_name: str):
         """将表中的现有数据填充到新创建的索引中。"""
@@ -119,16 +183,26 @@ class IndexManager:
         col_def_to_index: Optional[ColumnDefinition] = schema.get(column_name)
         if not col_def_to_index:
             raise ValueError(f"列 '{column_name}' 在表 '{self.table_name}' 中不存在。")
-        col_index = list(schema.keys()).index(column_name)
-
-        all_rows = self.storage_engine.scan_table(self.table_name)
-        for rid, row_data_bytes in all_rows:
-            value, _ = self.storage_engine._decode_value_from_row(row_data_bytes, col_index, schema)
-            key_bytes = self.storage_engine._prepare_key_for_b_tree(value, col_def_to_index.data_type)
-            insert_result = b_tree.insert(key_bytes, rid)
-
-            if insert_result is None and self.unique_indexes.get(index_name, False):
-                raise UniquenessViolationError(column_name, value)
+        read_value = self.storage_engine._get_column_reader(self.table_name, column_name)
+        encode_key, _ = self._get_key_encoder(column_name)
+
+        # 先收集全部 (键, RID) 并排序，再自底向上批量构建，避免逐键插入时的反复下降和分裂。
+        # 稳定排序保证重复键中排在前面的是先扫描到的行，与逐行插入时保留第一次出现的行一致。
+        keyed = []
+        for rid, row_data_bytes in self.storage_engine.iter_table(self.table_name):
+            value = read_value(row_data_bytes)
+            keyed.append((encode_key(value), rid, value))
+        keyed.sort(key=lambda entry: entry[0])
+
+        is_unique = self.unique_indexes.get(index_name, False)
+        sorted_pairs = []
+        for key, rid, value in keyed:
+            if sorted_pairs and sorted_pairs[-1][0] == key:
+                if is_unique:
+                    raise UniquenessViolationError(column_name, value)
+                continue
+            sorted_pairs.append((key, rid))
+        b_tree.bulk_load(sorted_pairs)
 
         if b_tree.root_page_id != table_meta['indexes'][index_name]['root_page_id']:
             self.update_index_root(column_name, b_tree.root_page_id)
@@ -138,53 +212,168 @@ class IndexManager:
         index_name = self.column_to_index.get(column_name)
         return self.indexes.get(index_name) if index_name else None
 
+    def search(self, column_name: str, key: bytes) -> Optional[Tuple[int, int]]:
+        """
+        在列上的索引中查找已编码的键，返回 RID；列上没有索引或键不存在时返回 None。
+        启用主键点查缓存时（pk_lookup_cache_size > 0），主键索引最近的查找结果缓存在有界的 LRU 字典中，
+        重复的点查不必每次从根下降；插入、删除和更新主键条目时移除对应的缓存项，索引被替换时清空整个缓存。
+        """
+        b_tree = self.get_index_for_column(column_name)
+        if b_tree is None:
+            return None
+        if not (self.pk_lookup_cache_size > 0 and self._get_key_encoder(column_name)[1]):
+            return b_tree.search(key)
+        pk_rids = self._pk_rids
+        rid = pk_rids.get(key)
+        if rid is not None:
+            pk_rids.move_to_end(key)
+            return rid
+        rid = b_tree.search(key)
+        if rid is not None:
+            pk_rids[key] = rid
+            if len(pk_rids) > self.pk_lookup_cache_size:
+                pk_rids.popitem(last=False)
+        return rid
+
+    def lookup(self, column_name: str, value: Any) -> Optional[Tuple[int, int]]:
+        """与 search 相同，但接受列的原始值：用该列缓存的键编码函数编码，无需调用方再查表结构。"""
+        return self.search(column_name, self._get_key_encoder(column_name)[0](value))
+
     def insert_entry(self, row_dict: Dict[str, Any], rid: Tuple[int, int]):
         """在新行插入后，更新所有索引，并对唯一索引进行冲突检查。"""
-        for col_name, index_name in self.column_to_index.items():
-            b_tree = self.indexes[index_name]
+        for col_name, b_tree, encode_key, is_pk, is_unique in self._get_index_entries():
             value = row_dict.get(col_name)
             if value is None: continue
 
-            col_def = self.storage_engine.catalog_page.get_table_metadata(self.table_name)['schema'][col_name]
-            key_bytes = self.storage_engine._prepare_key_for_b_tree(value, col_def.data_type)
-            insert_result = b_tree.insert(key_bytes, rid)
+            key = encode_key(value)
+            if is_pk:
+                self._pk_rids.pop(key, None)
+            insert_result = b_tree.insert(key, rid)
 
             if insert_result is None:
-                is_pk = any(c[0] == ColumnConstraint.PRIMARY_KEY for c in col_def.constraints)
                 if is_pk:
                     raise PrimaryKeyViolationError(value)
-                elif self.unique_indexes.get(index_name, False):
+                elif is_unique:
                     raise UniquenessViolationError(col_name, value)
 
             if insert_result: self.update_index_root(col_name, b_tree.root_page_id)
 
-    def delete_entry(self, row_dict: Dict[str, Any], rid: Tuple[int, int]):
-        """在行删除后，从所有索引中删除对应条目。"""
+    def prepare_bulk_keys(self, row_dicts: List[Dict[str, Any]]) -> Dict[str, List[Tuple[bytes, int]]]:
+        """
+        为一批待插入的行计算每个索引的 (键, 行下标) 列表，并按键排序。
+        唯一索引上的重复值（批内重复或与已有数据重复）会直接抛出异常；
+        非唯一索引与逐行插入的行为一致，重复键只保留第一次出现的行。
+        """
+        bulk_keys = {}
         for col_name, index_name in self.column_to_index.items():
+            encode_key, is_pk = self._get_key_encoder(col_name)
+            is_unique = is_pk or self.unique_indexes.get(index_name, False)
+            b_tree = self.indexes[index_name]
+
+            # 稳定排序保证重复键中排在前面的是先出现的行
+            keyed = sorted(((encode_key(row[col_name]), i) for i, row in enumerate(row_dicts)
+                            if row.get(col_name) is not None), key=lambda pair: pair[0])
+            deduped = []
+            for key, i in keyed:
+                duplicate = (deduped and deduped[-1][0] == key) or b_tree.search(key) is not None
+                if duplicate:
+                    if is_pk:
+                        raise PrimaryKeyViolationError(row_dicts[i][col_name])
+                    if is_unique:
+                        raise UniquenessViolationError(col_name, row_dicts[i][col_name])
+                    continue
+                deduped.append((key, i))
+            bulk_keys[col_name] = deduped
+        return bulk_keys
+
+    def apply_bulk_keys(self, bulk_keys: Dict[str, List[Tuple[bytes, int]]], rids: List[Tuple[int, int]]):
+        """
+        将 prepare_bulk_keys 的结果写入索引：空索引自底向上批量构建；
+        已有条目不多于本批条目时，丢弃旧树，把已有条目与本批条目归并后整体重新批量构建
+        （与 rebuild_index 一样，旧树占用的页面不做回收）；否则按键的顺序批量合并进已有的叶子。
+        """
+        for col_name, keyed in bulk_keys.items():
+            if not keyed:
+                continue
+            index_name = self.column_to_index[col_name]
             b_tree = self.indexes[index_name]
+            pairs = [(key, rids[i]) for key, i in keyed]
+            if b_tree.root_page_id is None or b_tree.root_page_id == INVALID_PAGE_ID:
+                root_changed = b_tree.bulk_load(pairs)
+            else:
+                # 最多只读出 len(pairs) + 1 个已有条目，就足以判断走哪条路径
+                existing = list(islice(b_tree.iter_items(), len(pairs) + 1))
+                if len(existing) <= len(pairs):
+                    b_tree = BPlusTree(self.bpm, INVALID_PAGE_ID)
+                    self.indexes[index_name] = b_tree
+                    self._index_entries = None
+                    self._pk_rids.clear()
+                    root_changed = b_tree.bulk_load(list(merge(existing, pairs, key=itemgetter(0))))
+                else:
+                    root_changed = b_tree.insert_many(pairs)
+            if root_changed:
+                self.update_index_root(col_name, b_tree.root_page_id)
+
+    def delete_entry(self, row_dict: Dict[str, Any], rid: Tuple[int, int]):
+        """在行删除后，从所有索引中删除对应条目。"""
+        for col_name, b_tree, encode_key, is_pk, _ in self._get_index_entries():
             value = row_dict.get(col_name)
             if value is None: continue
 
-            col_def = self.storage_engine.catalog_page.get_table_metadata(self.table_name)['schema'][col_name]
-            key_bytes = self.storage_engine._prepare_key_for_b_tree(value, col_def.data_type)
+            key = encode_key(value)
+            if is_pk:
+                self._pk_rids.pop(key, None)
+            if b_tree.delete(key): self.update_index_root(col_name, b_tree.root_page_id)
+
+    def update_entry(self, old_row_dict: Dict[str, Any], new_row_dict: Dict[str, Any],
+                     old_rid: Tuple[int, int], new_rid: Tuple[int, int]):
+        """
+        在行更新后维护索引：只处理取值或 RID 发生变化的索引列，
+        行原地更新且索引列未被修改时不产生任何 B+ 树操作。
+        """
+        for col_name, b_tree, encode_key, is_pk, is_unique in self._get_index_entries():
+            old_value, new_value = old_row_dict.get(col_name), new_row_dict.get(col_name)
+            if old_value == new_value:
+                # 键不变、只是行被迁移：原地改写叶子中的 RID，一次下降即可，不引起合并或分裂
+                if old_rid == new_rid or new_value is None:
+                    continue
+                key = encode_key(new_value)
+                if is_pk:
+                    self._pk_rids.pop(key, None)
+                if b_tree.update(key, new_rid):
+                    continue
 
-            if b_tree.delete(key_bytes): self.update_index_root(col_name, b_tree.root_page_id)
+            if old_value is not None:
+                old_key = encode_key(old_value)
+                if is_pk:
+                    self._pk_rids.pop(old_key, None)
+                if b_tree.delete(old_key):
+                    self.update_index_root(col_name, b_tree.root_page_id)
+            if new_value is None:
+                continue
+
+            new_key = encode_key(new_value)
+            if is_pk:
+                self._pk_rids.pop(new_key, None)
+            insert_result = b_tree.insert(new_key, new_rid)
+            if insert_result is None:
+                if is_pk:
+                    raise PrimaryKeyViolationError(new_value)
+                elif is_unique:
+                    raise UniquenessViolationError(col_name, new_value)
+            if insert_result: self.update_index_root(col_name, b_tree.root_page_id)
 
     def check_uniqueness_for_update(self, old_row_dict: Dict[str, Any], new_row_dict: Dict[str, Any],
                                     old_rid: Tuple[int, int]):
         """在更新操作前，检查新值是否会违反唯一性约束。"""
-        for col_name, index_name in self.column_to_index.items():
-            if not self.unique_indexes.get(index_name): continue
+        for col_name, b_tree, encode_key, is_pk, is_unique in self._get_index_entries():
+            if not is_unique: continue
             old_value, new_value = old_row_dict.get(col_name), new_row_dict.get(col_name)
             if old_value == new_value: continue
 
-            b_tree = self.indexes[index_name]
-            col_def = self.storage_engine.catalog_page.get_table_metadata(self.table_name)['schema'][col_name]
-            key_bytes = self.storage_engine._prepare_key_for_b_tree(new_value, col_def.data_type)
-            existing_rid = b_tree.search(key_bytes)
+            existing_rid = b_tree.search(encode_key(new_value))
 
             if existing_rid is not None and existing_rid != old_rid:
-                is_pk = any(c[0] == ColumnConstraint.PRIMARY_KEY for c in col_def.constraints)
                 if is_pk:
                     raise PrimaryKeyViolationError(new_value)
                 else:
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import struct
+
+_TEXT_LENGTH_STRUCT = struct.Struct('<I')
+
+
+class LazyRow(Mapping):
+    """
+    按需解码的只读行。
+    持有行的原始字节和表的行布局（见 StorageEngine._get_row_layout），
+    只有在某一列第一次被访问时，才解码到该列所在的段为止，并缓存结果。
+    对只读取少数列的谓词和 UPDATE 来说，可以跳过其余列的解码。
+    """
+
+    __slots__ = ('_row_data', '_layout', '_values', '_text_spans', '_next_segment', '_offset')
+
+    def __init__(self, row_data: bytes, layout: List[Tuple[Optional[struct.Struct], Tuple[str, ...], Tuple[Any, ...]]]):
+        self._row_data = row_data
+        self._layout = layout
+        self._values: Dict[str, Any] = {}
+        # 已定位但尚未解码的变长列：列名 -> (起始偏移, 结束偏移)
+        self._text_spans: Dict[str, Tuple[int, int]] = {}
+        self._next_segment = 0
+        self._offset = 0
+
+    def _advance(self) -> bool:
+        """定位下一个段；定长段整段解包，变长段只记录位置。没有剩余段时返回 False。"""
+        if self._next_segment >= len(self._layout):
+            return False
+        row_struct, names, _ = self._layout[self._next_segment]
+        self._next_segment += 1
+        try:
+            if row_struct is None:
+                start = self._offset + _TEXT_LENGTH_STRUCT.size
+                end = start + _TEXT_LENGTH_STRUCT.unpack_from(self._row_data, self._offset)[0]
+                if end > len(self._row_data):
+                    raise ValueError(f"变长列 '{names[0]}' 超出行数据末尾")
+                self._text_spans[names[0]] = (start, end)
+                self._offset = end
+            else:
+                self._values.update(zip(names, row_struct.unpack_from(self._row_data, self._offset)))
+                self._offset += row_struct.size
+        except struct.error as e:
+            raise ValueError(f"从偏移量 {self._offset} 解码行失败: {e}")
+        return True
+
+    def __getitem__(self, key: str) -> Any:
+        while True:
+            if key in self._values:
+                return self._values[key]
+            span = self._text_spans.pop(key, None)
+            if span is not None:
+                value = str(self._row_data[span[0]:span[1]], "utf-8")
+                self._values[key] = value
+                return value
+            if not self._advance():
+                raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        for _, names, _ in self._layout:
+            yield from names
+
+    def __len__(self) -> int:
+        return sum(len(names) for _, names, _ in self._layout)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import operator
+
+# 比较运算符到 operator 模块函数的映射，在模块加载时构建一次，
+# 供 Filter / Join / Update 等算子逐行求值时直接查表调用。
+COMPARISON_OPS = {
+    "=": operator.eq, "==": operator.eq,
+    ">": operator.gt, "<": operator.lt,
+    ">=": operator.ge, "<=": operator.le,
+    "!=": operator.ne, "<>": operator.ne,
+}
@@ -5,9 +5,11 @@ from typing import List, Any, Optional, Dict, Tuple
 
 from engine.operators.subquery import SubqueryOperator
 from sql.ast import *
-from sql.planner import Operator, LogicalPlan
+from sql.planner import Operator, LogicalPlan, SeqScan
 from engine.storage_engine import StorageEngine
 from engine.b_plus_tree import BPlusTree
+from engine.lazy_row import LazyRow
+from engine.operators.comparison import COMPARISON_OPS
 
 
 class FilterOperator(Operator):
@@ -36,10 +38,7 @@ class FilterOperator(Operator):
             column_name, value = self._extract_condition_parts()
 
             if column_name and value is not None:
-                col_def = self.storage_engine.catalog_page.get_table_metadata(table_name)['schema'][column_name]
-                key_bytes = self.storage_engine._prepare_key_for_b_tree(value, col_def.data_type)
-
-                rid = self.bplus_tree.search(key_bytes)
+                rid = self.storage_engine.get_index_manager(table_name).lookup(column_name, value)
                 if rid:
                     row_data = self.storage_engine.read_row(table_name, rid)
                     if row_data:
@@ -50,7 +49,18 @@ class FilterOperator(Operator):
                             return [(rid, row_dict)]
                 return []
 
-        # --- 路径 B: 全表扫描 + 过滤 ---
+        # --- 路径 B: 全定长表上的等值条件下推到存储引擎 ---
+        # 存储引擎在解包出的原始元组上直接比较，只为命中的记录构建行字典
+        if isinstance(self.child, SeqScan) and self._is_simple_equality_condition():
+            column_name, value = self._extract_condition_parts()
+            try:
+                matched = self.storage_engine.scan_table_fixed_width(self.child.table_name, (column_name, value))
+            except ValueError:
+                matched = None  # 列不存在等情况交给通用路径处理
+            if matched is not None:
+                return matched
+
+        # --- 路径 C: 全表扫描 + 过滤 ---
         raw_rows = self.executor.execute([self.child])
         results = []
         for item in raw_rows:
@@ -89,13 +99,10 @@ class FilterOperator(Operator):
             op = getattr(condition, "op", None) or getattr(condition, "operator", None)
             op_val = op.value.upper() if hasattr(op, "value") else str(op).upper()
 
-            if op_val in ("=", "=="): return left_val == right_val
-            if op_val == ">": return left_val > right_val
-            if op_val == "<": return left_val < right_val
-            if op_val == ">=": return left_val >= right_val
-            if op_val == "<=": return left_val <= right_val
-            if op_val in ("!=", "<>"): return left_val != right_val
-            raise NotImplementedError(f"不支持的二元运算符: {op_val}")
+            compare = COMPARISON_OPS.get(op_val)
+            if compare is None:
+                raise NotImplementedError(f"不支持的二元运算符: {op_val}")
+            return compare(left_val, right_val)
 
         return bool(self._eval_expr(condition, row))
 
@@ -103,7 +110,7 @@ class FilterOperator(Operator):
         if isinstance(expr, Literal):
             return expr.value
         if isinstance(expr, Column):
-            if isinstance(row, dict):
+            if isinstance(row, (dict, LazyRow)):
                 return row.get(expr.name)
             raise ValueError("无法对非字典类型的行解析列")
 
@@ -5,6 +5,7 @@ from typing import List, Any, Tuple, Dict
 from sql.ast import Expression, Column, BinaryExpression, Literal
 from sql.planner import Operator
 from engine.storage_engine import StorageEngine
+from engine.operators.comparison import COMPARISON_OPS
 
 
 class JoinOperator(Operator):
@@ -123,19 +124,10 @@ class JoinOperator(Operator):
             op = getattr(condition, "op", None)
             op_val = op.value.upper() if op and hasattr(op, "value") else str(op).upper()
 
-            if op_val in ("=", "=="):
-                return left_val == right_val
-            if op_val == "!=":
-                return left_val != right_val
-            if op_val == ">":
-                return left_val > right_val
-            if op_val == "<":
-                return left_val < right_val
-            if op_val == ">=":
-                return left_val >= right_val
-            if op_val == "<=":
-                return left_val <= right_val
-            return False
+            compare = COMPARISON_OPS.get(op_val)
+            if compare is None:
+                return False
+            return compare(left_val, right_val)
 
         return False
 
@@ -12,9 +12,11 @@ class SeqScanOperator:
     将行数据解码的逻辑统一委托给 StorageEngine，确保解码逻辑的一致性和健壮性。
     """
 
-    def __init__(self, table_name: str, storage_engine: StorageEngine):
+    def __init__(self, table_name: str, storage_engine: StorageEngine, lazy: bool = False):
         self.table_name = table_name
         self.storage_engine = storage_engine
+        # lazy 为 True 时返回按需解码的 LazyRow，供只读取少数列的上层算子（如 UPDATE）使用
+        self.lazy = lazy
 
     def execute(self) -> List[Tuple[Tuple[int, int], Dict[str, Any]]]:
         """
@@ -22,10 +24,16 @@ class SeqScanOperator:
         1. 从存储引擎获取所有行的原始字节数据。
         2. 调用存储引擎中心化的解码方法，将字节流转换为字典。
         """
-        # Step 1: 获取 (rid, raw_bytes) 列表
-        rows_with_rid = self.storage_engine.scan_table(self.table_name)
-        if not rows_with_rid:
-            return []
+        # 全定长列的表由存储引擎按页批量解码
+        fixed_width_rows = self.storage_engine.scan_table_fixed_width(self.table_name)
+        if fixed_width_rows is not None:
+            return fixed_width_rows
+
+        if self.lazy:
+            return self.storage_engine.scan_table_lazy(self.table_name)
+
+        # Step 1: 逐行获取 (rid, raw_bytes)，不先把整表物化为列表
+        rows_with_rid = self.storage_engine.iter_table(self.table_name)
 
         decoded_rows = []
         for rid, raw_row_data in rows_with_rid:
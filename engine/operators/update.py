@@ -1,8 +1,10 @@
+from collections import ChainMap
 from typing import Dict, Any, List, Tuple, Optional
 
 from engine.storage_engine import StorageEngine
 from sql.ast import Operator, Expression, Column, Literal, BinaryExpression
 from engine.exceptions import PrimaryKeyViolationError, UniquenessViolationError
+from engine.operators.comparison import COMPARISON_OPS
 
 
 class UpdateOperator(Operator):
@@ -26,16 +28,20 @@ class UpdateOperator(Operator):
         # 1. 通过子计划（通常是Filter或SeqScan）获取待更新行的RID和原始数据
         rows_to_update: List[Tuple[Tuple[int, int], Dict[str, Any]]] = self.executor.execute([self.child])
 
+        # 被 SET 子句修改的列；其余列的字节在存储引擎中直接从旧行复制
+        changed_columns = {col_name for col_name, _ in self.updates}
+
         updated_count = 0
         for original_rid, original_row_dict in rows_to_update:
             try:
                 # 2. 基于原始数据和SET子句，计算出更新后的新行字典
-                new_row_dict = dict(original_row_dict)
-                for col_name, expr in self.updates:
-                    new_row_dict[col_name] = self._eval_expr(expr, original_row_dict)
+                # 新行由 SET 的结果叠加在原始行之上，未修改的列不会被解码
+                new_values = {col_name: self._eval_expr(expr, original_row_dict) for col_name, expr in self.updates}
+                new_row_dict = ChainMap(new_values, original_row_dict)
 
                 # 3. 调用 StorageEngine 的统一更新接口，并传入事务ID
-                if self.storage_engine.update_row(self.table_name, original_rid, new_row_dict, self.txn_id):
+                if self.storage_engine.update_row(self.table_name, original_rid, new_row_dict, self.txn_id,
+                                                 changed_columns):
                     updated_count += 1
 
             except (PrimaryKeyViolationError, UniquenessViolationError) as e:
@@ -56,11 +62,7 @@ class UpdateOperator(Operator):
             left_val = self._eval_expr(expr.left, row)
             right_val = self._eval_expr(expr.right, row)
             op_val = expr.op.value
-            if op_val == '=': return left_val == right_val
-            if op_val == '>': return left_val > right_val
-            if op_val == '<': return left_val < right_val
-            if op_val == '>=': return left_val >= right_val
-            if op_val == '<=': return left_val <= right_val
-            if op_val in ('!=', '<>'): return left_val != right_val
+            compare = COMPARISON_OPS.get(op_val)
+            if compare is not None: return compare(left_val, right_val)
             raise NotImplementedError(f"不支持的二元运算符: {op_val}")
         raise NotImplementedError(f"不支持的表达式类型: {type(expr)}")
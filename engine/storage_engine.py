@@ -1,34 +1,108 @@
 from __future__ import annotations
-from typing import List, Dict, Optional, Any, Tuple, TYPE_CHECKING
+from typing import Callable, Iterator, List, Dict, Optional, Any, Set, Tuple, TYPE_CHECKING
+from array import array
+import base64
+import functools
 import struct
+import sys
 
 from sql.ast import ColumnDefinition, DataType, ColumnConstraint
-from engine.constants import ROW_LENGTH_PREFIX_SIZE
+from engine.constants import PAGE_SIZE, ROW_LENGTH_PREFIX_SIZE
 from engine.catalog_page import CatalogPage
 from engine.table_heap_page import TableHeapPage
 from engine.data_page import DataPage
+from engine.lazy_row import LazyRow
 from engine.exceptions import TableAlreadyExistsError, PrimaryKeyViolationError, TableNotFoundError, \
     UniquenessViolationError
-from storage.buffer_pool_manager import BufferPoolManager
+from storage.buffer_pool_manager import BufferPoolManager, Page
 from engine.transaction_manager import TransactionManager
 
 if TYPE_CHECKING:
     from engine.index_manager import IndexManager
     from engine.b_plus_tree import BPlusTree
 
+# 定长列类型到 struct 格式码的映射；TEXT/STRING 为变长列，单独处理
+_FIXED_WIDTH_CODES = {DataType.INT: 'i', DataType.FLOAT: 'f'}
+_FIXED_WIDTH_CONVERTERS = {DataType.INT: int, DataType.FLOAT: float}
+_TEXT_TYPES = (DataType.TEXT, DataType.STRING)
+_TEXT_LENGTH_STRUCT = struct.Struct('<I')
+
+# 索引键固定为 16 字节：INT 加上 2**63 的偏置后按 8 字节大端无符号整数编码再补零，
+# 使键的字节序与数值序一致（负数排在正数之前）；TEXT/STRING 为截断或补零后的 UTF-8 字节
+_INDEX_KEY_SIZE = 16
+_INT_KEY_STRUCT = struct.Struct('>Q8x')
+_INT_KEY_BIAS = 1 << 63
+
+
+def _encode_int_key(value: Any) -> bytes:
+    if value is None:
+        raise ValueError("索引键不能为 None。")
+    try:
+        return _INT_KEY_STRUCT.pack(value + _INT_KEY_BIAS)
+    except struct.error as e:
+        raise OverflowError(f"整数索引键 {value!r} 无法编码: {e}")
+
+
+# 短字符串的 TEXT 键编码结果缓存在 LRU 中，重复的点查和更新不必每次重新编码；
+# 长字符串不进入缓存，避免缓存持有大对象
+_TEXT_KEY_CACHE_MAX_LEN = 32
+
+
+@functools.lru_cache(maxsize=4096)
+def _encode_short_text_key(value: str) -> bytes:
+    return value.encode('utf-8')[:_INDEX_KEY_SIZE].ljust(_INDEX_KEY_SIZE, b'\x00')
+
+
+def _encode_text_key(value: Any) -> bytes:
+    if value is None:
+        raise ValueError("索引键不能为 None。")
+    value = value if type(value) is str else str(value)
+    if len(value) <= _TEXT_KEY_CACHE_MAX_LEN:
+        return _encode_short_text_key(value)
+    return value.encode('utf-8')[:_INDEX_KEY_SIZE].ljust(_INDEX_KEY_SIZE, b'\x00')
+
+
+_KEY_ENCODERS = {
+    DataType.INT: _encode_int_key,
+    DataType.TEXT: _encode_text_key,
+    DataType.STRING: _encode_text_key,
+}
+
 
 class StorageEngine:
     """
     存储引擎 (重构完善版)。
     将所有数据和索引的修改操作封装起来，保证原子性和一致性。
     """
-    B_PLUS_TREE_KEY_SIZE = 16
+    B_PLUS_TREE_KEY_SIZE = _INDEX_KEY_SIZE
+    # 顺序扫描时每次批量预读的数据页数
+    SCAN_PREFETCH_WINDOW = 32
+    # 每次经由缓冲池的全表扫描结束后，逐出超过这么多秒未被访问的页面；为 None 时不清理
+    SCAN_PURGE_MAX_AGE = 30.0
 
-    def __init__(self, buffer_pool_manager: BufferPoolManager):
+    def __init__(self, buffer_pool_manager: BufferPoolManager, pk_lookup_cache_size: int = 0):
+        """
+        Args:
+            buffer_pool_manager (BufferPoolManager): 缓冲池管理器。
+            pk_lookup_cache_size (int): 每个表的主键点查缓存最多保存多少个键，为 0 时禁用（见 IndexManager.search）。
+        """
         from engine.index_manager import IndexManager
         self.bpm = buffer_pool_manager
+        self.pk_lookup_cache_size = pk_lookup_cache_size
         self.index_managers: Dict[str, IndexManager] = {}
         self.txn_manager = TransactionManager(self)
+        # 每个表的行布局缓存，见 _get_row_layout
+        self._row_layouts: Dict[str, List[Tuple[Optional[struct.Struct], Tuple[str, ...], Tuple[Any, ...]]]] = {}
+        # (表名, 列名) -> 单列读取函数的缓存，见 _get_column_reader
+        self._column_readers: Dict[Tuple[str, str], Callable[[bytes], Any]] = {}
+        # 每个表的 (堆页面ID, 已反序列化的堆页目录) 缓存，见 _get_table_heap
+        self._table_heaps: Dict[str, Tuple[int, TableHeapPage]] = {}
+        # 堆页目录已修改、尚未序列化回堆页面的表，见 _flush_table_heap
+        self._dirty_heaps: Set[str] = set()
+        # 每个表中删除过记录、可能有可复用空间的数据页（仅在内存中维护的提示），见 _append_record
+        self._reusable_pages: Dict[str, Set[int]] = {}
+        # 每个表上一次接受插入的数据页ID，见 _acquire_insert_page
+        self._insert_pages: Dict[str, int] = {}
 
         is_dirty = False
         catalog_page_raw = self.bpm.fetch_page(0)
@@ -43,52 +117,141 @@ class StorageEngine:
                 is_dirty = False
             else:
                 self.catalog_page = CatalogPage()
-                catalog_page_raw.data = bytearray(self.catalog_page.serialize())
+                self.catalog_page.serialize_into(catalog_page_raw.data)
                 is_dirty = True
         finally:
             self.bpm.unpin_page(0, is_dirty)
 
+        # 目录页的修改只在内存中标记，写入页面推迟到目录页写回磁盘之前，见 _flush_catalog_page
+        self._catalog_dirty = False
+        # 最近一次修改后目录的编码结果，由写回钩子写入目录页
+        self._catalog_bytes: Optional[bytes] = None
+        self.bpm.set_write_back_hook(0, self._serialize_catalog_into)
         self._load_all_indexes()
+        if self.catalog_page.key_format_version < CatalogPage.KEY_FORMAT_VERSION:
+            self._upgrade_index_key_format()
 
     def _load_all_indexes(self) -> None:
         """在系统启动时，为每个表创建一个 IndexManager 实例来加载其所有索引。"""
         from engine.index_manager import IndexManager
         for table_name in self.catalog_page.tables.keys():
-            self.index_managers[table_name] = IndexManager(table_name, self)
+            self.index_managers[table_name] = IndexManager(table_name, self, self.pk_lookup_cache_size)
+
+    def _upgrade_index_key_format(self) -> None:
+        """旧版本目录页中 INT 列上的索引使用旧的键编码，按当前编码从表数据重建这些索引。"""
+        for table_name, index_manager in self.index_managers.items():
+            schema = self.catalog_page.get_table_metadata(table_name)['schema']
+            for col_name, index_name in list(index_manager.column_to_index.items()):
+                if schema[col_name].data_type == DataType.INT:
+                    index_manager.rebuild_index(index_name)
+        self.catalog_page.key_format_version = CatalogPage.KEY_FORMAT_VERSION
+        self._flush_catalog_page()
 
     def _prepare_key_for_b_tree(self, value: Any, col_type: DataType) -> bytes:
         """将Python值转换为B+树期望的、固定长度、可比较的字节键。"""
-        if value is None:
-            raise ValueError("索引键不能为 None。")
-        if col_type == DataType.INT:
-            key_bytes = value.to_bytes(8, 'big', signed=True)
-        elif col_type in (DataType.TEXT, DataType.STRING):
-            key_bytes = str(value).encode('utf-8')
-        else:
-            raise NotImplementedError(f"不支持的主键类型用于索引: {col_type.name}")
-
-        if len(key_bytes) > self.B_PLUS_TREE_KEY_SIZE:
-            key_bytes = key_bytes[:self.B_PLUS_TREE_KEY_SIZE]
+        return self.get_key_encoder(col_type)(value)
 
-        return key_bytes.ljust(self.B_PLUS_TREE_KEY_SIZE, b'\x00')
+    @staticmethod
+    def get_key_encoder(col_type: DataType) -> Callable[[Any], bytes]:
+        """返回指定列类型的索引键编码函数，供需要反复编码同一列的调用方缓存。"""
+        encoder = _KEY_ENCODERS.get(col_type)
+        if encoder is None:
+            raise NotImplementedError(f"不支持的主键类型用于索引: {col_type.name}")
+        return encoder
 
     def _flush_catalog_page(self) -> None:
-        """将目录页（CatalogPage）的内容序列化并强制写回磁盘。"""
+        """
+        标记目录页（CatalogPage）已修改。
+        目录在这里立即编码，超出一页时由引起修改的操作抛出异常；编码结果只在目录页写回磁盘之前
+        （见 _serialize_catalog_into）才写入页面，因此写回钩子不会在逐出或刷新时失败，
+        一批 CREATE TABLE 或索引根节点变化也只需钉住目录页一次。
+        """
+        self._catalog_bytes = self.catalog_page.encode()
+        if self._catalog_dirty:
+            # 写回钩子在目录页写盘时才清除该标记，因此标记仍在说明目录页还是缓冲池中的脏页，无需再钉住一次
+            return
         catalog_page_raw = self.bpm.fetch_page(0)
-        if catalog_page_raw:
-            try:
-                catalog_page_raw.data = bytearray(self.catalog_page.serialize())
-                self.bpm.unpin_page(0, True)
-            except Exception as e:
-                self.bpm.unpin_page(0, False)
-                raise e
-        else:
+        if not catalog_page_raw:
             raise RuntimeError("在缓冲池中找不到目录页，无法刷新。")
+        self._catalog_dirty = True
+        self.bpm.unpin_page(0, True)
+
+    def _serialize_catalog_into(self, page: Page) -> None:
+        """目录页的写回钩子：若目录有未写入页面的修改，则将其编码结果写入页面数据。"""
+        if self._catalog_dirty:
+            self.catalog_page.serialize_into(page.data, self._catalog_bytes)
+            self._catalog_dirty = False
+
+    def flush_catalog(self) -> None:
+        """立即将目录页序列化并写回磁盘。"""
+        self._flush_catalog_page()
+        self.bpm.flush_page(0)
+
+    def _get_table_heap(self, table_name: str) -> Tuple[int, TableHeapPage]:
+        """
+        获取（并缓存）表的堆页目录。
+        堆页目录只在分配新数据页时改变，且总是经由本引擎写回，
+        因此缓存后每次插入和扫描都无需再钉住并反序列化堆页面。
+        """
+        cached = self._table_heaps.get(table_name)
+        if cached is None:
+            table_metadata = self.catalog_page.get_table_metadata(table_name)
+            if not table_metadata:
+                raise TableNotFoundError(table_name)
+
+            heap_page_id = table_metadata['heap_root_page_id']
+            heap_page_raw = self.bpm.fetch_page(heap_page_id)
+            if not heap_page_raw:
+                raise IOError(f"无法为表 '{table_name}' 获取堆页面 {heap_page_id}。")
+            try:
+                cached = (heap_page_id, TableHeapPage.deserialize(heap_page_raw.data))
+            finally:
+                self.bpm.unpin_page(heap_page_id, False)
+            self._cache_table_heap(table_name, *cached)
+        return cached
+
+    def _cache_table_heap(self, table_name: str, heap_page_id: int, table_heap: TableHeapPage) -> None:
+        """缓存表的堆页目录，并为堆页面注册写回钩子。"""
+        self._table_heaps[table_name] = (heap_page_id, table_heap)
+        self.bpm.set_write_back_hook(heap_page_id,
+                                     lambda page, name=table_name: self._serialize_table_heap_into(name, page))
+
+    def _flush_table_heap(self, table_name: str) -> None:
+        """
+        标记缓存的堆页目录已修改。
+        与目录页相同，序列化推迟到堆页面写回磁盘之前（见 _serialize_table_heap_into）。
+        """
+        if table_name in self._dirty_heaps:
+            # 同 _flush_catalog_page：堆页面尚未写回，仍是缓冲池中的脏页
+            return
+        heap_page_id, _ = self._table_heaps[table_name]
+        heap_page_raw = self.bpm.fetch_page(heap_page_id)
+        if not heap_page_raw:
+            raise IOError(f"无法为表 '{table_name}' 获取堆页面 {heap_page_id}。")
+        self._dirty_heaps.add(table_name)
+        self.bpm.unpin_page(heap_page_id, True)
+
+    def _serialize_table_heap_into(self, table_name: str, page: Page) -> None:
+        """堆页面的写回钩子：若堆页目录有未序列化的修改，则将其写入页面数据。"""
+        if table_name in self._dirty_heaps:
+            self._table_heaps[table_name][1].serialize_into(page.data)
+            self._dirty_heaps.discard(table_name)
 
     def get_index_manager(self, table_name: str) -> Optional[IndexManager]:
         """获取指定表的索引管理器。"""
         return self.index_managers.get(table_name)
 
+    def reindex(self, table_name: str, index_name: Optional[str] = None) -> None:
+        """
+        从表数据重建索引（REINDEX）：每个索引收集全部键并排序后自底向上批量构建。
+        未给出 index_name 时重建该表的所有索引。
+        """
+        index_manager = self.get_index_manager(table_name)
+        if not self.catalog_page.get_table_metadata(table_name) or index_manager is None:
+            raise TableNotFoundError(table_name)
+        for name in ([index_name] if index_name is not None else list(index_manager.indexes)):
+            index_manager.rebuild_index(name)
+
     def create_table(self, table_name: str, columns: List[ColumnDefinition]) -> bool:
         """
         [MODIFIED]
@@ -105,22 +268,30 @@ class StorageEngine:
         try:
             schema_dict = {col.name: col for col in columns}
             self.catalog_page.add_table(table_name, table_heap_page.page_id, schema_dict)
-            self._flush_catalog_page()
-
-            self.index_managers[table_name] = IndexManager(table_name, self)
-
-            # [MODIFIED] 循环检查列定义，为 PRIMARY KEY 和 UNIQUE 约束自动创建索引
-            for col in columns:
-                is_pk = any(c[0] == ColumnConstraint.PRIMARY_KEY for c in col.constraints)
-                is_unique = any(c[0] == ColumnConstraint.UNIQUE for c in col.constraints)
-
-                # 如果是主键或唯一约束，则创建唯一索引
-                if is_pk or is_unique:
-                    # 对于主键，is_unique 必须为 True
-                    self.index_managers[table_name].create_index(col.name, is_unique=True)
+            try:
+                self._flush_catalog_page()
+
+                self.index_managers[table_name] = IndexManager(table_name, self, self.pk_lookup_cache_size)
+
+                # [MODIFIED] 循环检查列定义，为 PRIMARY KEY 和 UNIQUE 约束自动创建索引
+                for col in columns:
+                    is_pk = any(c[0] == ColumnConstraint.PRIMARY_KEY for c in col.constraints)
+                    is_unique = any(c[0] == ColumnConstraint.UNIQUE for c in col.constraints)
+
+                    # 如果是主键或唯一约束，则创建唯一索引
+                    if is_pk or is_unique:
+                        # 对于主键，is_unique 必须为 True
+                        self.index_managers[table_name].create_index(col.name, is_unique=True)
+            except Exception:
+                # 目录放不下新表（或其索引）时撤销 add_table，目录恢复为之前能放进一页的状态
+                del self.catalog_page.tables[table_name]
+                self.index_managers.pop(table_name, None)
+                self._flush_catalog_page()
+                raise
 
             empty_heap = TableHeapPage()
-            table_heap_page.data = bytearray(empty_heap.serialize())
+            empty_heap.serialize_into(table_heap_page.data)
+            self._cache_table_heap(table_name, table_heap_page.page_id, empty_heap)
         finally:
             self.bpm.unpin_page(table_heap_page.page_id, True)
 
@@ -157,7 +328,8 @@ class StorageEngine:
         if not old_row_data:
             return False
 
-        old_row_dict = self._decode_row(table_name, old_row_data)
+        # 删除只需要索引列的旧值来维护索引，按需解码即可
+        old_row_dict = self.lazy_row(table_name, old_row_data)
 
         if txn_id is not None:
             self.txn_manager.add_write_record(
@@ -172,18 +344,23 @@ class StorageEngine:
             return self._do_delete_immediate(table_name, rid, old_row_dict)
 
     def update_row(self, table_name: str, old_rid: Tuple[int, int], new_row_dict: Dict[str, Any],
-                   txn_id: Optional[int] = None) -> bool:
+                   txn_id: Optional[int] = None, changed_columns: Optional[Set[str]] = None) -> bool:
         """
         更新一行数据。
         - 如果 txn_id is None：立即更新（非事务模式）。
         - 如果 txn_id 不为 None：延迟更新（事务模式）。
+        - changed_columns 为实际被修改的列名集合；给出时，未修改列的字节直接从旧行复制。
         """
         old_row_data = self.read_row(table_name, old_rid)
         if not old_row_data:
             return False
 
-        old_row_dict = self._decode_row(table_name, old_row_data)
-        new_row_data = self._serialize_row(table_name, new_row_dict)
+        # 旧行只有索引列会被读取，按需解码即可
+        old_row_dict = self.lazy_row(table_name, old_row_data)
+        if changed_columns is None:
+            new_row_data = self._serialize_row(table_name, new_row_dict)
+        else:
+            new_row_data = self._serialize_row_update(table_name, old_row_data, new_row_dict, changed_columns)
 
         if txn_id is not None:
             self.txn_manager.add_write_record(
@@ -192,231 +369,554 @@ class StorageEngine:
                 table_name=table_name,
                 rid=old_rid,
                 old_dict=old_row_dict,
+                old_data=old_row_data,
                 new_data=new_row_data,
                 new_dict=new_row_dict
             )
             return True
         else:
-            return self._do_update_immediate(table_name, old_rid, old_row_dict, new_row_data, new_row_dict)
+            return self._do_update_immediate(table_name, old_rid, old_row_dict, new_row_data, new_row_dict,
+                                             old_row_data) is not None
 
     # --- 内部原子执行方法 (_do_*_immediate) ---
 
     def _do_insert_immediate(self, table_name: str, row_data: bytes, row_dict: Dict[str, Any]) -> bool:
         """原子性地插入数据并更新所有索引。"""
-        table_metadata = self.catalog_page.get_table_metadata(table_name)
-        if not table_metadata:
+        rid = self._append_record(table_name, row_data)
+
+        index_manager = self.get_index_manager(table_name)
+        if index_manager:
+            try:
+                index_manager.insert_entry(row_dict, rid)
+            except (PrimaryKeyViolationError, UniquenessViolationError) as e:
+                self._delete_record(rid, table_name)  # 回滚数据插入
+                raise e
+        return True
+
+    def bulk_insert_rows(self, table_name: str, rows: List[Tuple[bytes, Dict[str, Any]]]) -> int:
+        """
+        批量插入多行 (row_data, row_dict)，用于导入等一次写入大量数据的场景（非事务模式）。
+        先对整批数据做唯一性检查，再写入数据页，最后按索引键排序后一次性更新索引：
+        空索引直接自底向上批量构建，无需逐键从根下降并反复分裂。
+
+        Returns:
+            int: 插入的行数。
+        """
+        if not self.catalog_page.get_table_metadata(table_name):
             raise TableNotFoundError(table_name)
+        if not rows:
+            return 0
 
-        heap_page_id = table_metadata['heap_root_page_id']
-        heap_page_raw = self.bpm.fetch_page(heap_page_id)
-        if not heap_page_raw:
-            raise IOError(f"无法为表 '{table_name}' 获取堆页面 {heap_page_id}。")
+        index_manager = self.get_index_manager(table_name)
+        # 写入任何数据之前完成唯一性检查，失败时整批不生效
+        bulk_keys = index_manager.prepare_bulk_keys([row_dict for _, row_dict in rows]) if index_manager else None
+
+        rids = self._append_records(table_name, [row_data for row_data, _ in rows])
 
-        target_page_raw = None
-        heap_page_is_dirty = False
+        if index_manager:
+            index_manager.apply_bulk_keys(bulk_keys, rids)
+        return len(rids)
+
+    def _append_record(self, table_name: str, row_data: bytes) -> Tuple[int, int]:
+        """将一行数据写入表中有足够空间的数据页（必要时分配新页），返回其 RID。不涉及索引。"""
+        page_raw, data_page = self._acquire_insert_page(table_name, len(row_data) + ROW_LENGTH_PREFIX_SIZE)
         try:
-            table_heap = TableHeapPage.deserialize(heap_page_raw.data)
-            record_to_insert = (len(row_data) + ROW_LENGTH_PREFIX_SIZE).to_bytes(ROW_LENGTH_PREFIX_SIZE,
-                                                                                 "little") + row_data
-
-            for page_id in reversed(table_heap.get_page_ids()):
-                page_raw = self.bpm.fetch_page(page_id)
-                if page_raw:
-                    try:
-                        data_page = DataPage(page_raw.page_id, page_raw.data)
-                        if data_page.get_free_space() >= len(record_to_insert):
-                            target_page_raw = page_raw
-                            break
-                    finally:
-                        if target_page_raw is None or page_raw.page_id != target_page_raw.page_id:
-                            self.bpm.unpin_page(page_id, False)
-
-            if not target_page_raw:
-                target_page_raw = self.bpm.new_page()
-                if not target_page_raw:
-                    raise MemoryError("缓冲池已满，无法为插入创建新的数据页。")
-                table_heap.add_page_id(target_page_raw.page_id)
-                heap_page_raw.data = bytearray(table_heap.serialize())
-                heap_page_is_dirty = True
-
-            target_data_page = DataPage(target_page_raw.page_id, target_page_raw.data)
-            row_offset = target_data_page.insert_record(record_to_insert)
-            target_page_raw.data = bytearray(target_data_page.get_data())
-            rid = (target_page_raw.page_id, row_offset)
-
-            index_manager = self.get_index_manager(table_name)
-            if index_manager:
-                try:
-                    index_manager.insert_entry(row_dict, rid)
-                except (PrimaryKeyViolationError, UniquenessViolationError) as e:
-                    target_data_page.delete_record(row_offset)  # 回滚数据插入
-                    target_page_raw.data = bytearray(target_data_page.get_data())
-                    raise e
-            return True
+            return (page_raw.page_id, data_page.insert_row(row_data))
         finally:
-            self.bpm.unpin_page(heap_page_id, heap_page_is_dirty)
-            if target_page_raw:
-                self.bpm.unpin_page(target_page_raw.page_id, True)
+            self.bpm.unpin_page(page_raw.page_id, True)
 
-    def _do_delete_immediate(self, table_name: str, rid: Tuple[int, int], old_row_dict: Dict[str, Any]) -> bool:
-        """原子性地删除数据并更新所有索引。"""
-        index_manager = self.get_index_manager(table_name)
-        if index_manager:
-            index_manager.delete_entry(old_row_dict, rid)
+    def _append_records(self, table_name: str, rows_data: List[bytes]) -> List[Tuple[int, int]]:
+        """
+        批量写入多行，返回各行的 RID。不涉及索引。
+        当前数据页在写满之前一直保持钉住，只有放不下下一行时才换页或分配新页，
+        省去逐行查找目标页、钉住和解钉的开销。
+        """
+        rids = []
+        page_raw = None
+        data_page = None
+        try:
+            for row_data in rows_data:
+                record_length = len(row_data) + ROW_LENGTH_PREFIX_SIZE
+                if data_page is None or data_page.get_free_space() < record_length:
+                    if page_raw:
+                        self.bpm.unpin_page(page_raw.page_id, True)
+                        page_raw = None
+                    page_raw, data_page = self._acquire_insert_page(table_name, record_length)
+                rids.append((page_raw.page_id, data_page.insert_row(row_data)))
+        finally:
+            if page_raw:
+                self.bpm.unpin_page(page_raw.page_id, True)
+        return rids
 
+    def _acquire_insert_page(self, table_name: str, record_length: int) -> Tuple[Page, DataPage]:
+        """
+        找到表中能放下一条长度为 record_length（含长度前缀）的记录的数据页，必要时分配新页。
+        返回已钉住的 (页面, 直接操作该缓冲池帧的 DataPage)，由调用方负责解钉（标记为脏）。
+        """
+        _, table_heap = self._get_table_heap(table_name)
+        # 较早的页面已经写满，只需检查最后一页，以及删除过记录、可能有空间复用的页面；
+        # 上一次接受插入的页面最可能仍有空间，排在最前面，连续插入时通常第一次尝试就能命中
+        page_ids = table_heap.get_page_ids()
+        last_insert_page = self._insert_pages.get(table_name)
+        candidates = [last_insert_page] if last_insert_page is not None else []
+        if page_ids and page_ids[-1] != last_insert_page:
+            candidates.append(page_ids[-1])
+        reusable = self._reusable_pages.get(table_name)
+        if reusable:
+            candidates.extend(page_id for page_id in reusable if page_id not in candidates)
+        for page_id in candidates:
+            page_raw = self.bpm.fetch_page(page_id)
+            if not page_raw:
+                continue
+            # 直接在缓冲池帧上操作，省去整页复制和写回
+            data_page = DataPage(page_raw.page_id, page_raw.data, copy=False)
+            if data_page.can_insert(record_length):
+                self._insert_pages[table_name] = page_id
+                return page_raw, data_page
+            self.bpm.unpin_page(page_raw.page_id, False)
+            if reusable:
+                # 没有足够大的已删除记录，不再作为候选
+                reusable.discard(page_id)
+
+        if len(page_ids) >= TableHeapPage.MAX_PAGE_IDS:
+            raise ValueError(f"表 '{table_name}' 的数据页数量已达到堆页面上限 ({TableHeapPage.MAX_PAGE_IDS})。")
+        page_raw = self.bpm.new_page()
+        if not page_raw:
+            raise MemoryError("缓冲池已满，无法为插入创建新的数据页。")
+        table_heap.add_page_id(page_raw.page_id)
+        self._flush_table_heap(table_name)
+        self._insert_pages[table_name] = page_raw.page_id
+        return page_raw, DataPage(page_raw.page_id, page_raw.data, copy=False)
+
+    def _delete_record(self, rid: Tuple[int, int], table_name: Optional[str] = None) -> bool:
+        """
+        仅在数据页上逻辑删除一行，不涉及索引。
+        给出 table_name 时，记录该页有可复用的空间，之后的插入会优先填入已删除记录。
+        """
         page_id, offset = rid
         page = self.bpm.fetch_page(page_id)
         if not page:
             return False
         try:
-            data_page = DataPage(page.page_id, page.data)
-            deleted = data_page.delete_record(offset)
-            if deleted:
-                page.data = bytearray(data_page.get_data())
-            return deleted
+            deleted = DataPage(page.page_id, page.data, copy=False).delete_record(offset)
         finally:
             self.bpm.unpin_page(page_id, True)
+        if deleted and table_name is not None:
+            self._reusable_pages.setdefault(table_name, set()).add(page_id)
+        return deleted
+
+    def _do_delete_immediate(self, table_name: str, rid: Tuple[int, int], old_row_dict: Dict[str, Any]) -> bool:
+        """原子性地删除数据并更新所有索引。"""
+        index_manager = self.get_index_manager(table_name)
+        if index_manager:
+            index_manager.delete_entry(old_row_dict, rid)
+
+        return self._delete_record(rid, table_name)
 
     def _do_update_immediate(self, table_name: str, old_rid: Tuple[int, int], old_row_dict: Dict[str, Any],
-                             new_row_data: bytes, new_row_dict: Dict[str, Any]) -> bool:
-        """原子性地更新数据并更新所有索引。"""
+                             new_row_data: bytes, new_row_dict: Dict[str, Any],
+                             old_row_data: Optional[bytes] = None) -> Optional[Tuple[int, int]]:
+        """
+        原子性地更新数据并更新所有索引，返回该行更新后的 RID（行迁移时与 old_rid 不同），记录不存在时返回 None。
+        old_row_data 为更新前的行字节（前像）；索引更新失败时直接写回它，无需重新序列化旧行。
+        """
         index_manager = self.get_index_manager(table_name)
 
         if index_manager:
             index_manager.check_uniqueness_for_update(old_row_dict, new_row_dict, old_rid)
 
-        new_rid = self._update_data_page_record(old_rid, new_row_data)
+        new_rid = self._update_data_page_record(old_rid, new_row_data, table_name)
         if new_rid is None:
-            return False
+            return None
 
         if index_manager:
             try:
-                index_manager.delete_entry(old_row_dict, old_rid)
-                index_manager.insert_entry(new_row_dict, new_rid)
+                index_manager.update_entry(old_row_dict, new_row_dict, old_rid, new_rid)
             except Exception as e:
-                self._update_data_page_record(new_rid, self._serialize_row(table_name, old_row_dict))
+                if old_row_data is None:
+                    old_row_data = self._serialize_row(table_name, old_row_dict)
+                self._update_data_page_record(new_rid, old_row_data, table_name)
                 raise RuntimeError(f"索引更新失败，数据修改已尝试回滚: {e}") from e
 
-        return True
+        return new_rid
 
-    def _update_data_page_record(self, rid: Tuple[int, int], new_row_data: bytes) -> Optional[Tuple[int, int]]:
-        """仅更新数据页上的一行，如果行移动会返回新的RID。"""
+    def _update_data_page_record(self, rid: Tuple[int, int], new_row_data: bytes,
+                                 table_name: Optional[str] = None) -> Optional[Tuple[int, int]]:
+        """
+        仅更新数据页上的一行，如果行移动会返回新的RID。
+        新行不长于旧行时原地覆盖，RID 不变；变长后本页放不下时，若给出了 table_name，
+        则将新行追加到表的其他数据页并删除旧记录（行迁移）。
+        """
         page_id, old_offset = rid
         page = self.bpm.fetch_page(page_id)
         if not page:
             return None
+        relocate = False
         try:
-            data_page = DataPage(page.page_id, page.data)
-            new_record = (len(new_row_data) + ROW_LENGTH_PREFIX_SIZE).to_bytes(ROW_LENGTH_PREFIX_SIZE,
-                                                                               'little') + new_row_data
-            new_offset, _ = data_page.update_record(old_offset, new_record)
-            page.data = bytearray(data_page.get_data())
-            return (page_id, new_offset)
-        except (ValueError, IndexError):
+            data_page = DataPage(page.page_id, page.data, copy=False)
+            try:
+                new_offset, _ = data_page.update_row(old_offset, new_row_data)
+                return (page_id, new_offset)
+            except ValueError:
+                # 记录已被删除时放弃；记录存在、只是本页剩余空间放不下变长后的新行时迁移
+                relocate = data_page.get_record(old_offset) is not None
+        except IndexError:
             return None
         finally:
             self.bpm.unpin_page(page_id, True)
 
+        if not relocate or table_name is None:
+            return None
+        new_rid = self._append_record(table_name, new_row_data)
+        self._delete_record(rid, table_name)
+        return new_rid
+
     # --- 数据读取和序列化辅助方法 ---
 
-    def scan_table(self, table_name: str) -> List[Tuple[Tuple[int, int], bytes]]:
-        """扫描全表，返回所有行数据及其RID。"""
-        table_metadata = self.catalog_page.get_table_metadata(table_name)
-        if not table_metadata:
+    def _iter_data_pages(self, table_name: str):
+        """依次钉住表的每个数据页并产出 (page_id, DataPage)；消费方处理完当前页后，由生成器负责解钉。"""
+        _, table_heap = self._get_table_heap(table_name)
+        # 取快照：扫描期间（例如 INSERT ... SELECT）新增的数据页不在本次扫描范围内
+        page_ids = list(table_heap.get_page_ids())
+        for i, data_page_id in enumerate(page_ids):
+            # 每进入一个新的窗口，就批量预读接下来的若干页，随后的 fetch_page 直接命中缓冲池
+            if i % self.SCAN_PREFETCH_WINDOW == 0:
+                self.bpm.prefetch(page_ids[i:i + self.SCAN_PREFETCH_WINDOW], cold=True)
+            page_raw = self.bpm.fetch_page(data_page_id, cold=True)
+            if not page_raw: continue
+            try:
+                yield data_page_id, DataPage(page_raw.page_id, page_raw.data)
+            finally:
+                # 扫描过的页面作为冷页面解钉，下一轮预读优先淘汰它们，而不是其他热点页面；
+                # 扫描前已被随机访问（如索引查找）的页面由缓冲池保留其热度
+                self.bpm.unpin_page(data_page_id, False, cold=True)
+        # 扫描到达边界时顺带清理长时间未被访问的页面，为之后的访问留出空闲帧
+        if self.SCAN_PURGE_MAX_AGE is not None:
+            self.bpm.purge_older_than(self.SCAN_PURGE_MAX_AGE)
+
+    def _iter_data_pages_light(self, table_name: str):
+        """
+        _iter_data_pages 的轻量版本：页面经由 BufferPoolManager.read_page_light 读入一块复用的缓冲区，
+        不进入缓冲池，也不需要钉住和解钉，避免大表扫描挤出缓冲池中的热点页面。
+        页面是逐个同步读取的，因此每进入一个新的窗口，就提示操作系统提前读入接下来的若干页。
+        """
+        _, table_heap = self._get_table_heap(table_name)
+        buffer = bytearray(PAGE_SIZE)
+        page_ids = list(table_heap.get_page_ids())
+        for i, data_page_id in enumerate(page_ids):
+            if i % self.SCAN_PREFETCH_WINDOW == 0:
+                self.bpm.disk_manager.advise_willneed(page_ids[i:i + self.SCAN_PREFETCH_WINDOW])
+            if self.bpm.read_page_light(data_page_id, buffer):
+                yield data_page_id, DataPage(data_page_id, buffer)
+
+    def _iter_scan_pages(self, table_name: str):
+        """
+        全表扫描使用的页面迭代器：表的数据页多于缓冲池容量时，整表无论如何都无法常驻内存，
+        改用不经过缓冲池的轻量扫描，避免挤出热点页面；否则经由缓冲池读取。
+        """
+        _, table_heap = self._get_table_heap(table_name)
+        if len(table_heap.get_page_ids()) > self.bpm.pool_size:
+            return self._iter_data_pages_light(table_name)
+        return self._iter_data_pages(table_name)
+
+    def iter_table(self, table_name: str) -> Iterator[Tuple[Tuple[int, int], memoryview]]:
+        """
+        逐行产出全表的 (RID, 行数据)，不在内存中累积整表结果；顺序消费的调用方应优先使用它。
+        行数据是 DataPage 私有页面副本上的 memoryview 切片，不再逐行复制；需要长期持有时由调用方自行转为 bytes。
+        页面的读取方式见 _iter_scan_pages。
+        """
+        for data_page_id, data_page in self._iter_scan_pages(table_name):
+            for offset, row_data in data_page.iter_rows():
+                yield (data_page_id, offset), row_data
+
+    def scan_table(self, table_name: str) -> List[Tuple[Tuple[int, int], memoryview]]:
+        """扫描全表，以列表形式返回所有行数据及其RID（见 iter_table）。"""
+        return list(self.iter_table(table_name))
+
+    def scan_table_by_index(self, table_name: str, column_name: str) -> List[Tuple[Tuple[int, int], bytes]]:
+        """沿列上索引的叶子链，按该列的顺序返回全部 (RID, 行数据)。"""
+        b_tree = self._get_column_index(table_name, column_name)
+        rows = self._read_rows_prefetched(table_name, list(b_tree.iter_rids()))
+        return [(rid, row_data) for rid, row_data in rows if row_data is not None]
+
+    def multi_get(self, table_name: str, column_name: str, values: List[Any]) -> List[Optional[Tuple[Tuple[int, int], bytes]]]:
+        """
+        按列上的索引批量查找多个值，按 values 的顺序返回 (RID, 行数据)，找不到的值对应 None。
+        先查出全部 RID，再批量预读它们所在的数据页，而不是每查一个值就同步读一次数据页。
+        """
+        self._get_column_index(table_name, column_name)  # 校验表存在且列上有索引
+        lookup = self.get_index_manager(table_name).lookup
+        rids = [lookup(column_name, value) for value in values]
+        rows = iter(self._read_rows_prefetched(table_name, [rid for rid in rids if rid is not None]))
+        results = []
+        for rid in rids:
+            row = next(rows) if rid is not None else None
+            results.append(row if row is not None and row[1] is not None else None)
+        return results
+
+    def _get_column_index(self, table_name: str, column_name: str) -> BPlusTree:
+        """返回表中某一列上的 B+ 树索引；表不存在时抛出 TableNotFoundError，列上没有索引时抛出 ValueError。"""
+        index_manager = self.get_index_manager(table_name)
+        if not self.catalog_page.get_table_metadata(table_name) or index_manager is None:
             raise TableNotFoundError(table_name)
+        b_tree = index_manager.get_index_for_column(column_name)
+        if b_tree is None:
+            raise ValueError(f"列 '{column_name}' 上没有索引。")
+        return b_tree
 
-        heap_page_id = table_metadata['heap_root_page_id']
-        heap_page_raw = self.bpm.fetch_page(heap_page_id)
-        if not heap_page_raw:
-            raise IOError(f"无法为表 '{table_name}' 获取堆页面 {heap_page_id}。")
+    def _read_rows_prefetched(self, table_name: str, rids: List[Tuple[int, int]]) -> List[Tuple[Tuple[int, int], Optional[bytes]]]:
+        """
+        按给定顺序读取一批 RID 对应的行，返回 (RID, 行数据)，记录已不存在时行数据为 None。
+        这些 RID 指向的数据页通常不连续，因此按 RID 的顺序提前预读接下来的一批（去重后的）数据页，
+        预读时连续的页合并为一次 I/O，随后逐行读取时直接命中缓冲池。
+        """
+        # 按首次出现的顺序排列的数据页，以及每个数据页在其中的位置
+        page_order = list(dict.fromkeys(page_id for page_id, _ in rids))
+        page_position = {page_id: i for i, page_id in enumerate(page_order)}
+        window = max(1, min(self.SCAN_PREFETCH_WINDOW, self.bpm.pool_size // 2))
 
         results = []
-        try:
-            table_heap = TableHeapPage.deserialize(heap_page_raw.data)
-            for data_page_id in table_heap.get_page_ids():
-                page_raw = self.bpm.fetch_page(data_page_id)
-                if not page_raw: continue
-                try:
-                    data_page = DataPage(page_raw.page_id, page_raw.data)
-                    for offset, record in data_page.get_all_records():
-                        results.append(((data_page_id, offset), record[ROW_LENGTH_PREFIX_SIZE:]))
-                finally:
-                    self.bpm.unpin_page(data_page_id, False)
-        finally:
-            self.bpm.unpin_page(heap_page_id, False)
+        prefetched_until = 0  # page_order 中此位置之前的页面都已发起过预读
+        for rid in rids:
+            position = page_position[rid[0]]
+            if position >= prefetched_until:
+                self.bpm.prefetch(page_order[position:position + window])
+                prefetched_until = position + window
+            results.append((rid, self.read_row(table_name, rid)))
+        return results
 
+    def scan_table_fixed_width(self, table_name: str,
+                               equals: Optional[Tuple[str, Any]] = None) -> Optional[List[Tuple[Tuple[int, int], Dict[str, Any]]]]:
+        """
+        针对全定长列表的批量扫描，直接返回解码后的 (RID, 行字典)；若表含变长列则返回 None。
+        全定长表的每条记录（含已删除记录）长度都相同，因此可用一个"长度前缀 + 行"的 Struct
+        对整页已用区域做一次 iter_unpack，再按长度前缀的正负过滤掉已删除记录。
+        equals 为 (列名, 值) 时，直接在解包出的元组上做等值比较，只为命中的记录构建行字典。
+        """
+        layout = self._get_row_layout(table_name)
+        if len(layout) != 1 or layout[0][0] is None:
+            return None
+
+        row_struct, names, _ = layout[0]
+        if equals is not None:
+            if equals[0] not in names:
+                raise ValueError(f"列 '{equals[0]}' 在表 '{table_name}' 中不存在。")
+            # 元组第 0 项是长度前缀，列值从第 1 项开始
+            match_index, match_value = names.index(equals[0]) + 1, equals[1]
+        record_struct = struct.Struct('<i' + row_struct.format.lstrip('<'))
+        record_size = record_struct.size
+
+        results = []
+        for data_page_id, data_page in self._iter_scan_pages(table_name):
+            used = data_page.free_space_pointer
+            records = list(record_struct.iter_unpack(memoryview(data_page.data)[:used - used % record_size]))
+            if used % record_size or any(abs(values[0]) != record_size for values in records):
+                # 页面布局与定长假设不符时，退回逐条记录解码
+                for offset, row_data in data_page.iter_rows():
+                    row = self._decode_row(table_name, row_data)
+                    if equals is None or row.get(equals[0]) == match_value:
+                        results.append(((data_page_id, offset), row))
+                continue
+            for i, values in enumerate(records):
+                if values[0] > 0 and (equals is None or values[match_index] == match_value):
+                    results.append(((data_page_id, i * record_size), dict(zip(names, values[1:]))))
         return results
 
+    def scan_table_lazy(self, table_name: str) -> List[Tuple[Tuple[int, int], LazyRow]]:
+        """扫描全表，返回 (RID, LazyRow)，各列在第一次被访问时才解码。"""
+        return [(rid, self.lazy_row(table_name, row_data)) for rid, row_data in self.iter_table(table_name)]
+
+    def lazy_row(self, table_name: str, row_data: bytes) -> LazyRow:
+        """用表的行布局包装一行原始字节，得到按需解码的 LazyRow。"""
+        return LazyRow(row_data, self._get_row_layout(table_name))
+
     def read_row(self, table_name: str, rid: Tuple[int, int]) -> Optional[bytes]:
-        """根据RID（记录ID）读取单行数据。"""
+        """
+        根据RID（记录ID）读取单行数据。
+        直接在缓冲池帧上定位记录，只把行数据本身复制出来（页面解钉后帧可能被复用，因此必须复制）。
+        """
         page_id, offset = rid
         page = self.bpm.fetch_page(page_id)
         if not page: return None
         try:
-            data_page = DataPage(page.page_id, page.data)
-            record = data_page.get_record(offset)
-            return record[ROW_LENGTH_PREFIX_SIZE:] if record else None
+            return DataPage.read_record(page.data, offset)
         finally:
             self.bpm.unpin_page(page_id, False)
 
-    def _serialize_row(self, table_name: str, row_dict: Dict[str, Any]) -> bytes:
+    def _get_row_layout(self, table_name: str) -> List[Tuple[Optional[struct.Struct], Tuple[str, ...], Tuple[Any, ...]]]:
+        """
+        获取（并缓存）表的行布局：相邻的定长列合并为一个 struct.Struct 段，变长列单独成段（Struct 为 None）。
+        序列化时每个定长段只需一次 C 级打包调用。
+        缓存命中时只需一次字典查找，只有首次访问才会读取目录中的表结构。
+        """
+        layout = self._row_layouts.get(table_name)
+        if layout is not None:
+            return layout
+
         metadata = self.catalog_page.get_table_metadata(table_name)
         if not metadata: raise TableNotFoundError(table_name)
         schema = metadata['schema']
-        row_data = bytearray()
-
-        for col_name in schema.keys():
-            val = row_dict[col_name]
-            col_type = schema[col_name].data_type
-            if col_type == DataType.INT:
-                row_data.extend(int(val).to_bytes(4, "little", signed=True))
-            elif col_type in (DataType.TEXT, DataType.STRING):
-                encoded_str = str(val).encode("utf-8")
-                row_data.extend(len(encoded_str).to_bytes(4, "little"))
-                row_data.extend(encoded_str)
-            elif col_type == DataType.FLOAT:
-                row_data.extend(struct.pack("<f", float(val)))
-            else:
+        layout = []
+        fmt, names, converters = '', [], []
+        for col_name, col_def in schema.items():
+            col_type = col_def.data_type
+            code = _FIXED_WIDTH_CODES.get(col_type)
+            if code is not None:
+                fmt += code
+                names.append(col_name)
+                converters.append(_FIXED_WIDTH_CONVERTERS[col_type])
+                continue
+            if col_type not in _TEXT_TYPES:
                 raise NotImplementedError(f"不支持的数据类型: {col_type}")
-        return bytes(row_data)
+            if names:
+                layout.append((struct.Struct('<' + fmt), tuple(names), tuple(converters)))
+                fmt, names, converters = '', [], []
+            layout.append((None, (col_name,), (str,)))
+        if names:
+            layout.append((struct.Struct('<' + fmt), tuple(names), tuple(converters)))
+
+        self._row_layouts[table_name] = layout
+        return layout
+
+    def _get_column_reader(self, table_name: str, column_name: str) -> Callable[[bytes], Any]:
+        """
+        获取（并缓存）从一行原始字节中读取某一列的函数。
+        列之前只有定长列时，它在行内的偏移量是常量：读取函数直接用该列自己的 Struct 在固定偏移处解包，
+        不再逐列判断类型、也不解码其他列；列之前有变长列时，退回按行布局按需解码（LazyRow）。
+        """
+        key = (table_name, column_name)
+        reader = self._column_readers.get(key)
+        if reader is not None:
+            return reader
+
+        layout = self._get_row_layout(table_name)
+        if not any(column_name in names for _, names, _ in layout):
+            raise ValueError(f"列 '{column_name}' 在表 '{table_name}' 中不存在。")
+        offset = 0
+        for row_struct, names, _ in layout:
+            if column_name in names:
+                if row_struct is None:
+                    def reader(row_data, _offset=offset):
+                        start = _offset + _TEXT_LENGTH_STRUCT.size
+                        length = _TEXT_LENGTH_STRUCT.unpack_from(row_data, _offset)[0]
+                        return str(memoryview(row_data)[start:start + length], "utf-8")
+                else:
+                    codes = row_struct.format.lstrip('<')
+                    position = names.index(column_name)
+                    column_struct = struct.Struct('<' + codes[position])
+                    column_offset = offset + struct.calcsize('<' + codes[:position])
+
+                    def reader(row_data, _unpack=column_struct.unpack_from, _offset=column_offset):
+                        return _unpack(row_data, _offset)[0]
+                break
+            if row_struct is None:
+                # 之后的列偏移量取决于变长列的实际长度
+                def reader(row_data, _layout=layout):
+                    return LazyRow(row_data, _layout)[column_name]
+                break
+            offset += row_struct.size
+
+        self._column_readers[key] = reader
+        return reader
+
+    def _serialize_row(self, table_name: str, row_dict: Dict[str, Any]) -> bytes:
+        layout = self._get_row_layout(table_name)
+
+        parts = []
+        try:
+            for row_struct, names, converters in layout:
+                if row_struct is None:
+                    encoded_str = str(row_dict[names[0]]).encode("utf-8")
+                    parts.append(_TEXT_LENGTH_STRUCT.pack(len(encoded_str)))
+                    parts.append(encoded_str)
+                else:
+                    parts.append(row_struct.pack(*[conv(row_dict[name]) for name, conv in zip(names, converters)]))
+        except struct.error as e:
+            raise ValueError(f"序列化表 '{table_name}' 的行失败: {e}")
+
+        # 全定长表只有一个段，直接返回打包结果，避免额外的拼接
+        return parts[0] if len(parts) == 1 else b''.join(parts)
+
+    def _serialize_row_update(self, table_name: str, old_row_data: bytes, new_row_dict: Dict[str, Any],
+                              changed_columns: Set[str]) -> bytes:
+        """
+        按行布局逐段生成更新后的行：不含被修改列的段直接从旧行字节中复制，只有被修改的段重新编码。
+        """
+        layout = self._get_row_layout(table_name)
+
+        old_view = memoryview(old_row_data)
+        parts = []
+        src = 0
+        try:
+            for row_struct, names, converters in layout:
+                if row_struct is None:
+                    seg_len = _TEXT_LENGTH_STRUCT.size + _TEXT_LENGTH_STRUCT.unpack_from(old_row_data, src)[0]
+                    if names[0] in changed_columns:
+                        encoded_str = str(new_row_dict[names[0]]).encode("utf-8")
+                        parts.append(_TEXT_LENGTH_STRUCT.pack(len(encoded_str)))
+                        parts.append(encoded_str)
+                    else:
+                        parts.append(old_view[src:src + seg_len])
+                else:
+                    seg_len = row_struct.size
+                    if changed_columns.isdisjoint(names):
+                        parts.append(old_view[src:src + seg_len])
+                    else:
+                        parts.append(row_struct.pack(*[conv(new_row_dict[name]) for name, conv in zip(names, converters)]))
+                src += seg_len
+        except struct.error as e:
+            raise ValueError(f"序列化表 '{table_name}' 的行失败: {e}")
+
+        return b''.join(parts)
 
     def _decode_row(self, table_name: str, row_data: bytes) -> Dict[str, Any]:
-        metadata = self.catalog_page.get_table_metadata(table_name)
-        if not metadata: raise TableNotFoundError(table_name)
-        schema = metadata['schema']
+        """按缓存的行布局解码一行：每个定长段一次 unpack_from，变长列按长度前缀切片解码。"""
+        layout = self._get_row_layout(table_name)
+        # 变长列在 memoryview 上切片，解码前不产生中间的 bytes 副本
+        row_view = memoryview(row_data)
+
         row_dict = {}
         offset = 0
-        for col_name, col_def in schema.items():
-            value, new_offset = self._decode_value(row_data, offset, col_def.data_type)
-            row_dict[col_name] = value
-            offset = new_offset
+        try:
+            for row_struct, names, _ in layout:
+                if row_struct is None:
+                    length = _TEXT_LENGTH_STRUCT.unpack_from(row_data, offset)[0]
+                    offset += _TEXT_LENGTH_STRUCT.size
+                    if offset + length > len(row_data):
+                        raise ValueError(f"变长列 '{names[0]}' 超出行数据末尾")
+                    row_dict[names[0]] = str(row_view[offset: offset + length], "utf-8")
+                    offset += length
+                else:
+                    row_dict.update(zip(names, row_struct.unpack_from(row_data, offset)))
+                    offset += row_struct.size
+        except (struct.error, UnicodeDecodeError) as e:
+            raise ValueError(f"从偏移量 {offset} 解码表 '{table_name}' 的行失败: {e}")
         return row_dict
 
-    def _decode_value_from_row(self, row_data: bytes, col_index: int, schema: Dict[str, Any]) -> Tuple[Any, int]:
-        offset = 0
-        current_col_idx = 0
-        for col_def in schema.values():
-            if current_col_idx == col_index:
-                return self._decode_value(row_data, offset, col_def.data_type)
-            _, offset = self._decode_value(row_data, offset, col_def.data_type)
-            current_col_idx += 1
-        raise ValueError(f"列索引 {col_index} 越界。")
-
-    def _decode_value(self, row_data: bytes, offset: int, col_type: DataType) -> Tuple[Any, int]:
-        try:
-            if col_type == DataType.INT:
-                value = int.from_bytes(row_data[offset: offset + 4], "little", signed=True)
-                offset += 4
-            elif col_type in (DataType.TEXT, DataType.STRING):
-                length = int.from_bytes(row_data[offset: offset + 4], "little")
-                offset += 4
-                value = row_data[offset: offset + length].decode("utf-8")
-                offset += length
-            elif col_type == DataType.FLOAT:
-                value, = struct.unpack("<f", row_data[offset: offset + 4])
-                offset += 4
-            else:
-                raise NotImplementedError(f"不支持的解码类型: {col_type.name}")
-            return value, offset
-        except (struct.error, IndexError, UnicodeDecodeError) as e:
-            raise ValueError(f"从偏移量 {offset} 解码类型 {col_type.name} 失败: {e}")
+    def pack_float_columns(self, rows: List[Any], column_names: List[str]) -> bytes:
+        """
+        将结果集中的若干 FLOAT 列打包为紧凑的传输格式：按行优先排列的小端 float32 数组，再做 base64 编码。
+        适用于以浮点列为主的投影；客户端可用 unpack_float_columns（或 numpy.frombuffer(..., dtype='<f4')）还原。
+        rows 中的元素可以是行字典，也可以是算子产生的 (RID, 行字典) 元组；NULL 值编码为 NaN。
+        """
+        nan = float('nan')
+        values = array('f')
+        for item in rows:
+            row = item[1] if isinstance(item, tuple) else item
+            for col_name in column_names:
+                value = row.get(col_name)
+                values.append(nan if value is None else float(value))
+        if sys.byteorder != 'little':
+            values.byteswap()
+        return base64.b64encode(values.tobytes())
+
+    @staticmethod
+    def unpack_float_columns(blob: bytes, num_columns: int) -> List[Tuple[float, ...]]:
+        """pack_float_columns 的逆操作，返回每行一个浮点元组。"""
+        values = array('f')
+        values.frombytes(base64.b64decode(blob))
+        if sys.byteorder != 'little':
+            values.byteswap()
+        if num_columns <= 0 or len(values) % num_columns:
+            raise ValueError(f"打包数据的长度 {len(values)} 与列数 {num_columns} 不匹配。")
+        return [tuple(values[i:i + num_columns]) for i in range(0, len(values), num_columns)]
@@ -1,7 +1,11 @@
-from typing import List
+from array import array
+from typing import Iterable, Optional
 import struct
+import sys
 
-from engine.constants import PAGE_SIZE
+from engine.constants import PAGE_SIZE, ZERO_PAGE
+
+_COUNT = struct.Struct('<I')
 
 
 class TableHeapPage:
@@ -13,30 +17,49 @@ class TableHeapPage:
     PAGE_ID_SIZE = 4
     MAGIC = b'THP1'  # 格式签名，用于识别页面类型
     HEADER_SIZE = 8
+    # 一个堆页面最多能记录的数据页数量
+    MAX_PAGE_IDS = (PAGE_SIZE - HEADER_SIZE) // PAGE_ID_SIZE
 
-    def __init__(self, page_ids: List[int] = None):
-        self.page_ids = page_ids if page_ids is not None else []
+    def __init__(self, page_ids: Optional[Iterable[int]] = None):
+        # page_id 以 4 字节无符号整数紧凑存放在 array 中，序列化和反序列化都是整段内存复制
+        self.page_ids = array('I', page_ids if page_ids is not None else ())
 
     def add_page_id(self, page_id: int):
         """添加一个数据页的 page_id 到列表中。"""
         self.page_ids.append(page_id)
 
-    def get_page_ids(self) -> List[int]:
-        """获取所有数据页的 page_id 列表。"""
+    def get_page_ids(self) -> array:
+        """获取所有数据页的 page_id 列表（array('I')）。"""
         return self.page_ids
 
     def serialize(self) -> bytes:
         """将 TableHeapPage 序列化为字节。"""
+        data = bytearray(PAGE_SIZE)
+        self.serialize_into(data)
+        return bytes(data)
+
+    def serialize_into(self, buffer: bytearray) -> int:
+        """
+        将 TableHeapPage 直接序列化到调用方提供的页面缓冲区（通常是缓冲池帧）中，其余部分清零。
+
+        Returns:
+            int: 写入的有效字节数。
+        """
         count = len(self.page_ids)
-        parts = [self.MAGIC, struct.pack('<I', count)]  # 写入头部
-        if count > 0:
-            parts.append(struct.pack(f'<{count}I', *self.page_ids))
-        serialized_data = b''.join(parts)
+        size = self.HEADER_SIZE + count * self.PAGE_ID_SIZE
+        if size > PAGE_SIZE:
+            raise ValueError(f"序列化后的表堆页大小 ({size}) 超出页面限制 ({PAGE_SIZE})")
 
-        padding_size = PAGE_SIZE - len(serialized_data)
-        if padding_size < 0:
-            raise ValueError(f"序列化后的表堆页大小 ({len(serialized_data)}) 超出页面限制 ({PAGE_SIZE})")
-        return serialized_data + b'\0' * padding_size
+        view = memoryview(buffer)
+        view[:4] = self.MAGIC  # 写入头部
+        _COUNT.pack_into(buffer, 4, count)
+        page_ids = self.page_ids
+        if sys.byteorder != 'little':
+            page_ids = array('I', page_ids)
+            page_ids.byteswap()
+        view[self.HEADER_SIZE:size] = memoryview(page_ids).cast('B')
+        view[size:PAGE_SIZE] = memoryview(ZERO_PAGE)[size:]
+        return size
 
     @staticmethod
     def deserialize(data: bytes):
@@ -45,14 +68,14 @@ class TableHeapPage:
             # 如果没有数据，或长度不足，或MAGIC签名不匹配，则返回空对象
             return TableHeapPage([])
 
-        count = struct.unpack('<I', data[4:8])[0]
+        count = _COUNT.unpack_from(data, 4)[0]
         # 安全检查，防止因count损坏导致读取越界
         max_possible = (len(data) - TableHeapPage.HEADER_SIZE) // TableHeapPage.PAGE_ID_SIZE
         count = min(count, max_possible)
 
-        page_ids = []
-        if count > 0:
-            start = TableHeapPage.HEADER_SIZE
-            end = start + count * TableHeapPage.PAGE_ID_SIZE
-            page_ids = list(struct.unpack(f'<{count}I', data[start:end]))
-        return TableHeapPage(page_ids)
+        heap = TableHeapPage()
+        start = TableHeapPage.HEADER_SIZE
+        heap.page_ids.frombytes(data[start:start + count * TableHeapPage.PAGE_ID_SIZE])
+        if sys.byteorder != 'little':
+            heap.page_ids.byteswap()
+        return heap
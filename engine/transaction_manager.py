@@ -23,32 +23,62 @@ class TransactionManager:
         print(f"事务 {txn_id} 正在提交...")
 
         write_set = self.transactions[txn_id]['write_set']
+        # 写记录中的 RID 都是语句执行时从已提交状态读到的；本次提交中已被删除的 RID，
+        # 其空间可能已被之后的 INSERT 复用，之后引用它的写记录不能再作用到这个位置上
+        deleted_rids = set()
+        # 本次提交中已被更新的行：写记录中的 RID -> 该行当前的 RID（行迁移后两者不同）
+        updated_rids: Dict[Tuple[int, int], Tuple[int, int]] = {}
 
         # 按照顺序应用写集合中的所有操作
-        for write_record in write_set:
+        i = 0
+        while i < len(write_set):
+            write_record = write_set[i]
             op_type = write_record['op_type']
             table_name = write_record['table_name']
+            i += 1
 
             if op_type == 'INSERT':
-                self.storage_engine._do_insert_immediate(
-                    table_name,
-                    write_record['new_data'],
-                    write_record['new_dict']
-                )
-            elif op_type == 'DELETE':
-                self.storage_engine._do_delete_immediate(
-                    table_name,
-                    write_record['rid'],
-                    write_record['old_dict']
-                )
-            elif op_type == 'UPDATE':
-                self.storage_engine._do_update_immediate(
-                    table_name,
-                    write_record['rid'],
-                    write_record['old_dict'],
-                    write_record['new_data'],
-                    write_record['new_dict']
-                )
+                # 同一张表上连续的多条 INSERT 合并为一次批量插入：
+                # 数据页只钉住一次，索引键排序后一次性写入，而不是逐行从根下降
+                rows = [(write_record['new_data'], write_record['new_dict'])]
+                while i < len(write_set) and write_set[i]['op_type'] == 'INSERT' \
+                        and write_set[i]['table_name'] == table_name:
+                    rows.append((write_set[i]['new_data'], write_set[i]['new_dict']))
+                    i += 1
+                if len(rows) == 1:
+                    self.storage_engine._do_insert_immediate(table_name, *rows[0])
+                else:
+                    self.storage_engine.bulk_insert_rows(table_name, rows)
+            elif write_record['rid'] in deleted_rids:
+                # 该行已在本次提交中删除，与对已删除记录执行 DELETE / UPDATE 一样不产生效果
+                continue
+            else:
+                rid = write_record['rid']
+                current_rid = updated_rids.get(rid, rid)
+                old_dict = write_record['old_dict']
+                old_data = write_record.get('old_data')
+                if rid in updated_rids:
+                    # 写记录中的前像是该行在本次提交更新之前的内容，按当前 RID 重新读取
+                    old_data = self.storage_engine.read_row(table_name, current_rid)
+                    if old_data is None:
+                        continue
+                    old_dict = self.storage_engine.lazy_row(table_name, old_data)
+
+                if op_type == 'DELETE':
+                    self.storage_engine._do_delete_immediate(table_name, current_rid, old_dict)
+                    updated_rids.pop(rid, None)
+                    deleted_rids.add(rid)
+                elif op_type == 'UPDATE':
+                    new_rid = self.storage_engine._do_update_immediate(
+                        table_name,
+                        current_rid,
+                        old_dict,
+                        write_record['new_data'],
+                        write_record['new_dict'],
+                        old_data
+                    )
+                    if new_rid is not None:
+                        updated_rids[rid] = new_rid
 
         print(f"事务 {txn_id} 已提交。")
         self.transactions[txn_id]['state'] = 'committed'
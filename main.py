@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-from typing import List, Union
+from typing import List, Optional, Union
 
 from sql.lexer import Lexer
 from sql.parser import Parser
@@ -14,6 +14,8 @@ from storage.lru_replacer import LRUReplacer
 
 DB_FILE_PATH = "minidb.db"
 BUFFER_POOL_SIZE = 100  # 假设缓冲池大小为100个页面
+COMPRESSED_POOL_SIZE = 200  # 被逐出页面的压缩副本最多保留的数量
+PACK_FLOAT_RESULTS = False  # 为 True 时，只含浮点列的查询结果以打包的 float32/base64 格式输出
 
 
 def main():
@@ -21,7 +23,8 @@ def main():
     # 按照正确的依赖顺序初始化所有底层组件
     disk_manager = DiskManager(DB_FILE_PATH)
     lru_replacer = LRUReplacer(BUFFER_POOL_SIZE)
-    buffer_pool_manager = BufferPoolManager(BUFFER_POOL_SIZE, disk_manager, lru_replacer)
+    buffer_pool_manager = BufferPoolManager(BUFFER_POOL_SIZE, disk_manager, lru_replacer,
+                                            COMPRESSED_POOL_SIZE)
 
     # 将正确初始化的 buffer_pool_manager 注入到 StorageEngine
     storage_engine = StorageEngine(buffer_pool_manager)
@@ -82,8 +85,10 @@ def main():
                         if result:
                             first_item = result[0] if result else None
                             if first_item and isinstance(first_item, dict):
+                                packed = format_packed_floats(storage_engine, result) \
+                                    if PACK_FLOAT_RESULTS else None
                                 # 使用表格格式化器
-                                print(format_table(result))
+                                print(packed if packed is not None else format_table(result))
                                 print(f"{len(result)} row(s) in set")
                             else:
                                 # UPDATE / DELETE / INSERT 返回影响的行数
@@ -232,6 +237,26 @@ def format_table(rows: List[dict]) -> str:
     return "\n".join(result)
 
 
+def format_packed_floats(storage_engine: StorageEngine, rows: List[dict]) -> Optional[str]:
+    """
+    将只含浮点列的结果集格式化为列名行加打包的 float32/base64 数据（见 StorageEngine.pack_float_columns）。
+    结果中含有非浮点列时返回 None，由调用方回退到表格输出。
+    """
+    headers = list(rows[0].keys())
+    has_float = False
+    for row in rows:
+        for h in headers:
+            value = row[h]
+            if isinstance(value, float):
+                has_float = True
+            elif value is not None:
+                return None
+    if not has_float:
+        return None
+    blob = storage_engine.pack_float_columns(rows, headers)
+    return f"float32[{', '.join(headers)}]\n{blob.decode('ascii')}"
+
+
 if __name__ == '__main__':
     print('Welcome to MiniDB! Type "exit" or "quit" to leave.')
     main()
\ No newline at end of file
@@ -4,6 +4,7 @@
 支持事务、并发控制、复杂索引、查询优化、访问控制等高级功能
 """
 
+import sys
 from enum import Enum
 from typing import List, Optional, Union, Dict, Any, Tuple, Set
 
@@ -197,7 +198,8 @@ class ColumnDefinition:
                  length: Optional[int] = None,
                  precision: Optional[int] = None,
                  scale: Optional[int] = None):
-        self.name = name
+        # 列名会作为行字典的键被反复查找，驻留后字典探测可直接走身份比较
+        self.name = sys.intern(name) if isinstance(name, str) else name
         self.data_type = data_type
         self.constraints = constraints if constraints else []
         self.default_value = default_value
@@ -265,7 +267,7 @@ class Column(Expression):
     """列引用表达式"""
 
     def __init__(self, name: str, table: Optional[str] = None, alias: Optional[str] = None):
-        self.name = name
+        self.name = sys.intern(name) if isinstance(name, str) else name
         self.table = table  # 表名前缀（可选）
         self.alias = alias  # 别名（可选）
 
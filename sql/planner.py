@@ -15,9 +15,10 @@ class LogicalPlan:
 # ===== 基本算子 =====
 
 class SeqScan(LogicalPlan):
-    def __init__(self, table_name: str):
+    def __init__(self, table_name: str, lazy: bool = False):
         self.table_name = table_name
         self.filter = None
+        self.lazy = lazy  # 是否产出按需解码的行
 
     def __repr__(self):
         return f"SeqScan(table={self.table_name})"
@@ -317,7 +318,8 @@ class Planner:
 
     def plan_update(self, statement: UpdateStatement) -> Update:
         """生成更新的逻辑计划，自动构造 child（SeqScan + 可选 Filter）"""
-        child = SeqScan(statement.table_name)
+        # UPDATE 只读取 WHERE 和 SET 涉及的列，扫描产出按需解码的行
+        child = SeqScan(statement.table_name, lazy=True)
         if statement.where:
             child = Filter(statement.where, child)
         return Update(statement.table_name, statement.assignments, statement.where, child)
@@ -1,9 +1,11 @@
 from collections import deque
 from .disk_manager import DiskManager
 from .lru_replacer import LRUReplacer
+from .compressed_page import CompressedPageCache
 
 # 导入 threading 模块，为并发环境下的锁机制提供支持
 import threading
+import time
 # 导入 logging 模块，用于记录日志
 import logging
 
@@ -28,6 +30,10 @@ class Page:
         # 引用计数
         self.pin_count: int = 0
         self.is_dirty: bool = False
+        # 最近一次变为未钉住状态的时间（time.monotonic()），见 BufferPoolManager.purge_older_than
+        self.last_unpinned: float = 0.0
+        # 载入后是否只被顺序扫描访问过；只有这样的页面才会按冷页面解钉，见 BufferPoolManager.unpin_page
+        self.scan_only: bool = False
 
     def reset(self):
         """重置 Page 对象的元数据，以便重用。"""
@@ -35,6 +41,8 @@ class Page:
         self.data.clear()
         self.pin_count = 0
         self.is_dirty = False
+        self.last_unpinned = 0.0
+        self.scan_only = False
 
     def __repr__(self) -> str:
         """为 Page 对象提供一个便于调试的字符串表示形式。"""
@@ -48,17 +56,28 @@ class BufferPoolManager:
     and flushing pages from memory to disk.
     """
 
-    def __init__(self, pool_size: int, disk_manager: DiskManager, lru_replacer: LRUReplacer):
+    # 线性预读：连续多少次按页号递增的未命中之后，自动预读后续页面，以及每次预读的页数
+    READ_AHEAD_THRESHOLD = 8
+    READ_AHEAD_PAGES = 32
+
+    def __init__(self, pool_size: int, disk_manager: DiskManager, lru_replacer: LRUReplacer,
+                 compressed_pool_size: int = 0):
         """
         初始化 BufferPoolManager。
         Args:
             pool_size (int): 缓冲池中的帧数。
             disk_manager (DiskManager): DiskManager 实例。
-            lru_replacer (LRUReplacer): LRUReplacer 实例。
+            lru_replacer (LRUReplacer): 页面替换器，LRUReplacer 或接口相同的 ClockReplacer 实例。
+            compressed_pool_size (int): 被逐出页面的压缩副本最多保留多少个，为 0 时禁用。
         """
         self.pool_size = pool_size
         self.disk_manager = disk_manager
         self.lru_replacer = lru_replacer
+        self.compressed_pages = CompressedPageCache(compressed_pool_size)
+        # 全零的整页，用于就地清零复用的帧缓冲区
+        self._zero_page = bytes(disk_manager.page_size)
+        # page_id -> 回调：页面写回磁盘前调用，供上层把延迟的修改写入页面数据，见 set_write_back_hook
+        self.write_back_hooks = {}
 
         # 创建一个包含 pool_size 个独立 Page 对象的列表，并将这个列表赋值给 self.pages
         self.pages = [Page() for _ in range(pool_size)]
@@ -72,7 +91,11 @@ class BufferPoolManager:
         self.num_requests = 0
         self.num_hits = 0
         self.num_replacements = 0
+        self.num_compressed_hits = 0
 
+        # 顺序访问检测的状态：上一次未命中的页号，以及当前连续递增未命中的次数
+        self.last_missed_page_id = None
+        self.sequential_misses = 0
 
     def __enter__(self):
         """进入 with 语句时调用。"""
@@ -91,6 +114,22 @@ class BufferPoolManager:
         self.flush_all_pages()
         self.disk_manager.close()
 
+    def set_write_back_hook(self, page_id: int, hook):
+        """
+        为一个页面注册写回钩子 hook(page)。每次该页写回磁盘（逐出或刷新）之前都会先调用它，
+        上层可以借此只在内存中标记修改，把序列化推迟到真正写盘时（例如目录页）。
+        钩子在持有缓冲池锁时被调用，只能修改 page.data，不能再调用缓冲池的方法，也不能抛出异常
+        （可能失败的检查应在上层标记修改时完成）。
+        """
+        self.write_back_hooks[page_id] = hook
+
+    def _write_back(self, page: Page):
+        """私有辅助方法：调用写回钩子（如有）后将页面写入磁盘。调用方需持有锁。"""
+        hook = self.write_back_hooks.get(page.page_id)
+        if hook is not None:
+            hook(page)
+        self.disk_manager.write_page(page.page_id, page.data)
+
     def _find_free_frame(self) -> int | None:
         """
         私有辅助方法，用于寻找一个可用的帧。
@@ -100,9 +139,39 @@ class BufferPoolManager:
             return self.free_list.popleft()
         return self.lru_replacer.victim()
 
-    def fetch_page(self, page_id: int) -> Page | None:
+    def _evict_frame(self, frame_id: int, target: str):
+        """
+        私有辅助方法：若帧中仍有旧页，则将其逐出（脏页先写回磁盘），为 target 腾出空间。
+        注意：此方法本身不加锁，因为它总是被持有锁的公共方法调用。
+        """
+        old_page = self.pages[frame_id]
+        if old_page.page_id is None:
+            return
+        self.num_replacements += 1  # 记录一次替换
+        # 页面替换是热路径：只在 DEBUG 级别记录，并由 logging 延迟格式化，未启用时不产生字符串拼接和输出
+        logging.debug("Page Replacement: Evicting page %s from frame %s to make space for %s.",
+                      old_page.page_id, frame_id, target)
+        if old_page.is_dirty:
+            logging.debug("Writing dirty page %s to disk before eviction.", old_page.page_id)
+            self._write_back(old_page)
+        self.compressed_pages.put(old_page.page_id, old_page.data)
+        del self.page_table[old_page.page_id]
+
+    def _reusable_buffer(self, page: Page) -> bytearray | None:
+        """
+        私有辅助方法：返回帧中旧页面留下的整页缓冲区，供新页面直接复用，省去一次整页分配。
+        旧页面此时已被逐出（脏页已写回、压缩缓存保存的是副本），缓冲区不再被其他对象使用。
+        帧从未使用过或缓冲区已被释放时返回 None。
+        """
+        if len(page.data) == self.disk_manager.page_size:
+            return page.data
+        return None
+
+    def fetch_page(self, page_id: int, cold: bool = False) -> Page | None:
         """
         获取一个数据页。如果页在缓冲池中，直接返回；否则从磁盘加载。
+        cold=True 表示本次是顺序扫描式的一次性访问；不带 cold 的（随机）访问会把页面标记为热点，
+        之后扫描对它的访问不会让它提前被淘汰。
         此方法是线程安全的。
         """
         with self.latch:
@@ -114,6 +183,8 @@ class BufferPoolManager:
                 frame_id = self.page_table[page_id]
                 page = self.pages[frame_id]
                 page.pin_count += 1
+                if not cold:
+                    page.scan_only = False
                 self.lru_replacer.pin(frame_id)
                 return page
 
@@ -124,38 +195,141 @@ class BufferPoolManager:
                 return None  # 所有帧都被钉住，无法获取新页。
 
             # 3. 如果找到的帧之前被占用，处理旧的页（页面替换）。
-            old_page = self.pages[frame_id]
-            if old_page.page_id is not None:
-                self.num_replacements += 1  # 记录一次替换
-                logging.info(f"Page Replacement: Evicting page {old_page.page_id} from frame {frame_id} to make space for page {page_id}.")
-                if old_page.is_dirty:
-                    logging.info(f"Writing dirty page {old_page.page_id} to disk before eviction.")
-                    self.disk_manager.write_page(old_page.page_id, old_page.data)
-                del self.page_table[old_page.page_id]
-
-            # 4. 从磁盘读取新页的数据，并更新 Page 对象的元数据。
-            try:
-                page_data = self.disk_manager.read_page(page_id)
-            except IndexError:
-                # 如果请求的 page_id 在磁盘上不存在，DiskManager 会抛出异常。
-                # 在这种情况下，我们无法获取页面，将释放的帧归还并返回 None。
-                self.free_list.append(frame_id)
-                return None
+            self._evict_frame(frame_id, f"page {page_id}")
 
+            # 4. 优先从压缩页缓存中解压，否则从磁盘读取新页的数据，并更新 Page 对象的元数据。
             page = self.pages[frame_id]
+            page_data = self.compressed_pages.pop(page_id)
+            if page_data is not None:
+                self.num_compressed_hits += 1
+            else:
+                try:
+                    # 帧中留有旧页面的缓冲区时直接读入其中，不再分配新的 bytearray
+                    page_data = self._reusable_buffer(page)
+                    if page_data is not None:
+                        self.disk_manager.read_page_into(page_id, page_data)
+                    else:
+                        page_data = self.disk_manager.read_page(page_id)
+                except IndexError:
+                    # 如果请求的 page_id 在磁盘上不存在，DiskManager 会抛出异常。
+                    # 在这种情况下，我们无法获取页面，将释放的帧归还并返回 None。
+                    self.free_list.append(frame_id)
+                    return None
+
             page.page_id = page_id
             page.data = page_data
             page.pin_count = 1
             page.is_dirty = False
+            page.scan_only = cold
 
-            # 5. 更新页表，将新页钉住，并返回 Page 对象。
+            # 5. 更新页表，将新页钉住。
             self.page_table[page_id] = frame_id
             self.lru_replacer.pin(frame_id)
+
+            # 6. 顺序访问检测：连续的递增未命中说明调用方在顺序读取，提前预读后续页面。
+            if self.last_missed_page_id is not None and page_id == self.last_missed_page_id + 1:
+                self.sequential_misses += 1
+            else:
+                self.sequential_misses = 1
+            self.last_missed_page_id = page_id
+            if self.sequential_misses >= self.READ_AHEAD_THRESHOLD:
+                self.sequential_misses = 0
+                self._prefetch(range(page_id + 1, page_id + 1 + self.READ_AHEAD_PAGES), cold)
             return page
 
-    def unpin_page(self, page_id: int, is_dirty: bool) -> bool:
+    def prefetch(self, page_ids: list[int], cold: bool = False) -> int:
+        """
+        预读一批页面到缓冲池中（不钉住），供随后的顺序访问直接命中。
+        不在缓冲池中的页面通过 DiskManager.read_pages 批量读取，连续的页合并为一次 I/O。
+        为避免预读的页面互相挤占，一次最多占用缓冲池一半的帧。
+        cold=True 时预读的页面作为冷页面加入替换策略（供顺序扫描使用），含义同 fetch_page。
+        此方法是线程安全的。
+
+        Returns:
+            int: 实际载入缓冲池的页面数。
+        """
+        with self.latch:
+            return self._prefetch(page_ids, cold)
+
+    def _prefetch(self, page_ids, cold: bool = False) -> int:
+        """prefetch 的实现部分。调用方需持有锁。"""
+        num_pages = self.disk_manager.get_num_pages()
+        missing = [pid for pid in dict.fromkeys(page_ids)
+                   if pid not in self.page_table and 0 <= pid < num_pages]
+        missing = missing[:max(1, self.pool_size // 2)]
+        if not missing:
+            return 0
+
+        page_data = {}
+        for pid in missing:
+            data = self.compressed_pages.pop(pid)
+            if data is not None:
+                self.num_compressed_hits += 1
+                page_data[pid] = data
+
+        # 先为每个页面选好帧并逐出旧页面，再把磁盘上的页面直接读入这些帧留下的缓冲区，省去整页分配
+        frames = {}
+        for pid in missing:
+            frame_id = self._find_free_frame()
+            if frame_id is None:
+                break
+            self._evict_frame(frame_id, f"prefetched page {pid}")
+            frames[pid] = frame_id
+        to_read = [pid for pid in frames if pid not in page_data]
+        buffers = {}
+        for pid in to_read:
+            buffer = self._reusable_buffer(self.pages[frames[pid]])
+            if buffer is not None:
+                buffers[pid] = buffer
+        try:
+            page_data.update(self.disk_manager.read_pages(to_read, buffers))
+        except Exception:
+            # 读取失败时归还已腾空的帧
+            for frame_id in frames.values():
+                self.pages[frame_id].page_id = None
+                self.free_list.append(frame_id)
+            raise
+
+        for pid, frame_id in frames.items():
+            page = self.pages[frame_id]
+            page.page_id = pid
+            page.data = page_data[pid]
+            page.pin_count = 0
+            page.is_dirty = False
+            page.last_unpinned = time.monotonic()
+            page.scan_only = cold
+            self.page_table[pid] = frame_id
+            # 预读的页面未被钉住，直接成为可淘汰的候选者
+            self.lru_replacer.unpin(frame_id, cold)
+        return len(frames)
+
+    def read_page_light(self, page_id: int, buffer: bytearray) -> bool:
+        """
+        将一个页的当前内容复制到调用方的缓冲区，但不把它载入缓冲池（“轻量读”）。
+        页面已在缓冲池中时复制帧中的数据（可能是尚未写回的脏页），否则直接从磁盘读取；
+        不会钉住页面，也不会触发页面替换，适合只读一次的大表顺序扫描。
+        此方法是线程安全的。
+
+        Returns:
+            bool: 页面存在并读取成功时返回 True。
+        """
+        with self.latch:
+            self.num_requests += 1
+            if page_id in self.page_table:
+                self.num_hits += 1
+                buffer[:] = self.pages[self.page_table[page_id]].data
+                return True
+            try:
+                self.disk_manager.read_page_into(page_id, buffer)
+            except IndexError:
+                return False
+            return True
+
+    def unpin_page(self, page_id: int, is_dirty: bool, cold: bool = False) -> bool:
         """
         当上层模块使用完一个页后，调用此方法来“解钉”。
+        cold=True 表示该页在短期内不会再被访问（如顺序扫描），解钉后优先被淘汰；
+        但载入后被随机访问过的页面（见 fetch_page）属于工作集，仍按普通页面解钉。
         此方法是线程安全的。
         """
         with self.latch:
@@ -174,10 +348,38 @@ class BufferPoolManager:
                 page.is_dirty = True
 
             if page.pin_count == 0:
-                self.lru_replacer.unpin(frame_id)
+                page.last_unpinned = time.monotonic()
+                self.lru_replacer.unpin(frame_id, cold and page.scan_only)
 
             return True
 
+    def purge_older_than(self, max_age_seconds: float) -> int:
+        """
+        逐出所有未钉住、且已超过 max_age_seconds 秒未被钉住的页面（脏页先写回磁盘），把帧归还空闲列表。
+        长时间运行时，偶尔访问一次的页面会一直占着帧，直到被替换策略挤出；
+        定期清理可以让之后的新页面直接使用空闲帧，而不必在 I/O 路径上淘汰旧页。
+        此方法是线程安全的。
+
+        Returns:
+            int: 被逐出的页面数。
+        """
+        with self.latch:
+            now = time.monotonic()
+            purged = 0
+            for frame_id, page in enumerate(self.pages):
+                if page.page_id is None or page.pin_count > 0 or now - page.last_unpinned <= max_age_seconds:
+                    continue
+                # 从替换策略的候选者中移除，再按普通的淘汰流程写回并移出页表
+                self.lru_replacer.pin(frame_id)
+                self._evict_frame(frame_id, "an age-based purge")
+                # 保留帧的缓冲区：之后载入该帧的页面会直接复用它（见 _reusable_buffer）
+                page.page_id = None
+                page.is_dirty = False
+                page.last_unpinned = 0.0
+                self.free_list.append(frame_id)
+                purged += 1
+            return purged
+
     def new_page(self) -> Page | None:
         """
         在数据库中创建一个新页，并将其加载到缓冲池中。
@@ -191,14 +393,7 @@ class BufferPoolManager:
                 return None
 
             # 2. 如果找到的帧之前被占用，处理旧的页（页面替换）。
-            old_page = self.pages[frame_id]
-            if old_page.page_id is not None:
-                self.num_replacements += 1 # 记录一次替换
-                logging.info(f"Page Replacement: Evicting page {old_page.page_id} from frame {frame_id} for a new page.")
-                if old_page.is_dirty:
-                    logging.info(f"Writing dirty page {old_page.page_id} to disk before eviction.")
-                    self.disk_manager.write_page(old_page.page_id, old_page.data)
-                del self.page_table[old_page.page_id]
+            self._evict_frame(frame_id, "a new page")
 
             # 3. 调用 DiskManager 在磁盘上分配一个新页。
             new_page_id = self.disk_manager.allocate_page()
@@ -206,8 +401,14 @@ class BufferPoolManager:
             # 4. 在帧中设置新页的元数据。
             page = self.pages[frame_id]
             page.page_id = new_page_id
-            page.data = bytearray(self.disk_manager.page_size)
+            buffer = self._reusable_buffer(page)
+            if buffer is not None:
+                buffer[:] = self._zero_page
+                page.data = buffer
+            else:
+                page.data = bytearray(self.disk_manager.page_size)
             page.pin_count = 1
+            page.scan_only = False
             # 新创建的页应被视为“脏”页，因为它在内存中的状态（空页）
             # 需要最终被写回磁盘，以持久化这个“空”的状态。
             page.is_dirty = True
@@ -224,6 +425,8 @@ class BufferPoolManager:
         此方法是线程安全的。
         """
         with self.latch:
+            # 被删除的页面不应再从压缩页缓存中“复活”。
+            self.compressed_pages.discard(page_id)
             if page_id not in self.page_table:
                 # 如果页不在缓冲池中，可以认为它已经被“删除”了，直接返回成功。
                 return True
@@ -274,7 +477,7 @@ class BufferPoolManager:
             if page.page_id is None:
                 return False
 
-            self.disk_manager.write_page(page.page_id, page.data)
+            self._write_back(page)
             page.is_dirty = False
 
             return True
@@ -282,15 +485,20 @@ class BufferPoolManager:
     def flush_all_pages(self) -> bool:
         """
         将缓冲池中所有脏页刷回磁盘。
+        先对每个脏页调用写回钩子，再通过 DiskManager.write_pages 一次性写出，连续的页合并为一次 I/O。
         此方法是线程安全的。
         """
         with self.latch:
-            for page in self.pages:
-                if page.page_id is not None and page.is_dirty:
-                    # 调用 flush_page 在其内部会再次获取锁，这会导致死锁。
-                    # 因此，我们直接在这里实现 flush 逻辑。
-                    self.disk_manager.write_page(page.page_id, page.data)
-                    page.is_dirty = False
+            dirty_pages = [page for page in self.pages if page.page_id is not None and page.is_dirty]
+            for page in dirty_pages:
+                # 调用 flush_page 在其内部会再次获取锁，这会导致死锁，因此直接调用钩子。
+                hook = self.write_back_hooks.get(page.page_id)
+                if hook is not None:
+                    hook(page)
+            # 钩子可能替换 page.data，因此在调用完全部钩子之后再收集页面数据
+            self.disk_manager.write_pages({page.page_id: page.data for page in dirty_pages})
+            for page in dirty_pages:
+                page.is_dirty = False
             return True
 
     # --- 新增：统计信息方法 ---
@@ -307,6 +515,7 @@ class BufferPoolManager:
                 "requests": self.num_requests,
                 "hits": self.num_hits,
                 "replacements": self.num_replacements,
+                "compressed_hits": self.num_compressed_hits,
                 "hit_rate_percent": f"{hit_rate:.2f}%"
             }
             return stats
@@ -320,5 +529,6 @@ class BufferPoolManager:
         logging.info(f"Total Requests:   {stats['requests']}")
         logging.info(f"Cache Hits:       {stats['hits']}")
         logging.info(f"Page Replacements:{stats['replacements']}")
+        logging.info(f"Compressed Hits:  {stats['compressed_hits']}")
         logging.info(f"Hit Rate:         {stats['hit_rate_percent']}")
         logging.info("-------------------------")
@@ -0,0 +1,71 @@
+# --- Clock 替换策略 ---
+# ClockReplacer 与 LRUReplacer 接口相同（victim / pin / unpin），可以直接替换后者传给 BufferPoolManager。
+# 它用一圈“引用位”近似 LRU：解钉只是置位两个数组元素，不需要像有序字典那样调整链表；
+# 只有需要淘汰时，时钟指针才沿着帧数组扫描，跳过被钉住的帧，
+# 引用位为 1 的帧获得“第二次机会”（清零后继续扫描），遇到引用位为 0 的可淘汰帧即将其淘汰。
+class ClockReplacer:
+    """
+    ClockReplacer manages page eviction using the clock (second-chance) policy.
+    """
+    def __init__(self, capacity: int):
+        """
+        初始化 ClockReplacer。
+        Args:
+            capacity (int): 缓冲池中帧的总数。
+        """
+        self.capacity = capacity
+        # 每个帧是否可淘汰（pin_count 为 0），以及最近是否被访问过
+        self.evictable = [False] * capacity
+        self.referenced = [False] * capacity
+        self.num_evictable = 0
+        # 时钟指针：下一次扫描从这个帧开始
+        self.hand = 0
+
+    def victim(self) -> int | None:
+        """
+        淘汰一个帧：从时钟指针处开始扫描，清除沿途可淘汰帧的引用位，直到遇到引用位已为 0 的帧。
+        最多扫描两圈（第一圈清除所有引用位，第二圈必然找到受害者）。
+        Returns:
+            int | None: 被淘汰的帧的 ID。如果没有可淘汰的帧，则返回 None。
+        """
+        if self.num_evictable == 0:
+            return None
+        evictable, referenced = self.evictable, self.referenced
+        hand = self.hand
+        for _ in range(2 * self.capacity):
+            frame_id = hand
+            hand = (hand + 1) % self.capacity
+            if not evictable[frame_id]:
+                continue
+            if referenced[frame_id]:
+                referenced[frame_id] = False
+                continue
+            evictable[frame_id] = False
+            self.num_evictable -= 1
+            self.hand = hand
+            return frame_id
+        self.hand = hand
+        return None
+
+    def pin(self, frame_id: int):
+        """
+        当一个页被“钉住”时，它不应被淘汰。
+        Args:
+            frame_id (int): 被钉住的帧的 ID。
+        """
+        if self.evictable[frame_id]:
+            self.evictable[frame_id] = False
+            self.num_evictable -= 1
+
+    def unpin(self, frame_id: int, cold: bool = False):
+        """
+        当一个页的 pin_count 变为 0 时，它成为可淘汰的候选者，并置上引用位。
+        对于顺序扫描这类只访问一次的页面（cold=True），不置引用位，使其在下一次扫描到时就被淘汰。
+        Args:
+            frame_id (int): 被解钉的帧的 ID。
+            cold (bool): 是否作为冷页面加入，默认为 False。
+        """
+        if not self.evictable[frame_id]:
+            self.evictable[frame_id] = True
+            self.num_evictable += 1
+        self.referenced[frame_id] = not cold
@@ -0,0 +1,67 @@
+from collections import OrderedDict
+
+import zlib
+
+# Blosc 为可选依赖：安装时使用 shuffle + LZ4 的块压缩，否则退回标准库 zlib。
+try:
+    import blosc
+except ImportError:
+    blosc = None
+
+
+def compress_page(data: bytearray) -> bytes:
+    """压缩一个页面的字节数据。"""
+    if blosc is not None:
+        return blosc.compress(bytes(data), typesize=4, cname='lz4', clevel=3, shuffle=blosc.SHUFFLE)
+    return zlib.compress(bytes(data), 1)
+
+
+def decompress_page(blob: bytes) -> bytearray:
+    """将 compress_page 的结果还原为页面字节数组。"""
+    if blosc is not None:
+        return bytearray(blosc.decompress(blob))
+    return bytearray(zlib.decompress(blob))
+
+
+# --- 压缩页缓存 ---
+# CompressedPageCache 是缓冲池之下的二级缓存。
+# 页面被逐出缓冲池时（脏页已先写回磁盘），将其压缩后的副本保存在这里；
+# 再次访问该页时优先从这里解压，省去一次磁盘读取。
+# 由于只保存与磁盘内容一致的“干净”副本，丢弃任何条目都不会影响持久性。
+class CompressedPageCache:
+    """
+    CompressedPageCache keeps compressed copies of pages evicted from the buffer pool.
+    """
+
+    def __init__(self, capacity: int):
+        """
+        初始化 CompressedPageCache。
+        Args:
+            capacity (int): 最多保存的压缩页数量，为 0 时禁用。
+        """
+        self.capacity = capacity
+        # 与 LRUReplacer 相同，用 OrderedDict 按最近放入的顺序淘汰。
+        self.cache = OrderedDict()
+
+    def put(self, page_id: int, data: bytearray):
+        """压缩并保存一个被逐出的页面，超出容量时淘汰最旧的条目。"""
+        if self.capacity <= 0:
+            return
+        self.cache[page_id] = compress_page(data)
+        self.cache.move_to_end(page_id)
+        while len(self.cache) > self.capacity:
+            self.cache.popitem(last=False)
+
+    def pop(self, page_id: int) -> bytearray | None:
+        """取出并解压一个页面；页面回到缓冲池后由缓冲池负责，因此从本缓存中移除。"""
+        blob = self.cache.pop(page_id, None)
+        if blob is None:
+            return None
+        return decompress_page(blob)
+
+    def discard(self, page_id: int):
+        """丢弃一个页面的压缩副本（例如页面被删除时）。"""
+        self.cache.pop(page_id, None)
+
+    def __len__(self) -> int:
+        return len(self.cache)
@@ -1,5 +1,10 @@
 import os
 
+# os.preadv / os.pwritev / os.posix_fadvise 仅在部分平台（如 Linux）上可用，不可用时退回 seek + read / write。
+_HAS_PREADV = hasattr(os, 'preadv')
+_HAS_PWRITEV = hasattr(os, 'pwritev')
+_HAS_FADVISE = hasattr(os, 'posix_fadvise')
+
 
 # --- Class Docstring ---
 # DiskManager 负责所有底层的磁盘I/O操作。
@@ -72,6 +77,89 @@ class DiskManager:
         page_data = self.db_file.read(self.page_size)
         return bytearray(page_data)
 
+    def read_page_into(self, page_id: int, buffer: bytearray):
+        """
+        将一个完整的页读入调用方提供的缓冲区，供需要反复读取页面的调用方复用同一块内存。
+
+        Args:
+            page_id (int): 要读取的页的ID。
+            buffer (bytearray): 长度为 page_size 的目标缓冲区。
+        """
+        if page_id >= self.num_pages:
+            raise IndexError(f"Page ID {page_id} is out of bounds (total pages: {self.num_pages}).")
+        if len(buffer) != self.page_size:
+            raise ValueError(f"Buffer has size {len(buffer)}, but page size is {self.page_size}.")
+
+        offset = page_id * self.page_size
+        if not (_HAS_PREADV and os.preadv(self.db_file.fileno(), [buffer], offset) == self.page_size):
+            self.db_file.seek(offset)
+            self.db_file.readinto(buffer)
+
+    def read_pages(self, page_ids: list[int], buffers: dict[int, bytearray] | None = None) -> dict[int, bytearray]:
+        """
+        批量读取多个页。按 page_id 排序后，将连续的页合并为一次 preadv（或 seek + read），
+        减少顺序扫描时的系统调用次数。
+
+        Args:
+            page_ids (list[int]): 要读取的页的ID列表。
+            buffers (dict[int, bytearray] | None): 可选，部分页的目标缓冲区（长度为 page_size），
+                这些页直接读入其中，不再分配新的 bytearray。
+
+        Returns:
+            dict[int, bytearray]: page_id 到页面数据的映射。
+        """
+        result = {}
+        ordered = sorted(set(page_ids))
+        for page_id in ordered:
+            if page_id >= self.num_pages:
+                raise IndexError(f"Page ID {page_id} is out of bounds (total pages: {self.num_pages}).")
+
+        i = 0
+        while i < len(ordered):
+            # 找出从 ordered[i] 开始的一段连续页
+            j = i + 1
+            while j < len(ordered) and ordered[j] == ordered[j - 1] + 1:
+                j += 1
+            offset = ordered[i] * self.page_size
+            run_buffers = []
+            for page_id in ordered[i:j]:
+                buffer = buffers.get(page_id) if buffers else None
+                if buffer is None or len(buffer) != self.page_size:
+                    buffer = bytearray(self.page_size)
+                run_buffers.append(buffer)
+            # 分散读：一次系统调用直接读入各页自己的缓冲区，省去切片拷贝；
+            # 平台不支持或读取不完整时退回 seek + read。
+            if not (_HAS_PREADV and
+                    os.preadv(self.db_file.fileno(), run_buffers, offset) == len(run_buffers) * self.page_size):
+                self.db_file.seek(offset)
+                run = self.db_file.read(len(run_buffers) * self.page_size)
+                for k in range(len(run_buffers)):
+                    run_buffers[k][:] = run[k * self.page_size:(k + 1) * self.page_size]
+            for k in range(j - i):
+                result[ordered[i + k]] = run_buffers[k]
+            i = j
+        return result
+
+    def advise_willneed(self, page_ids: list[int]):
+        """
+        提示操作系统这些页即将被读取（POSIX_FADV_WILLNEED），让内核在后台提前把它们读入页缓存，
+        随后的同步读取直接命中。连续的页合并为一次调用；越界的页被忽略，平台不支持时什么也不做。
+
+        Args:
+            page_ids (list[int]): 即将读取的页的ID列表。
+        """
+        if not _HAS_FADVISE:
+            return
+        ordered = sorted(pid for pid in set(page_ids) if 0 <= pid < self.num_pages)
+        fd = self.db_file.fileno()
+        i = 0
+        while i < len(ordered):
+            j = i + 1
+            while j < len(ordered) and ordered[j] == ordered[j - 1] + 1:
+                j += 1
+            os.posix_fadvise(fd, ordered[i] * self.page_size, (j - i) * self.page_size, os.POSIX_FADV_WILLNEED)
+            i = j
+
     # --- 3. 页面写入 ---
     def write_page(self, page_id: int, page_data: bytearray):
         """
@@ -98,6 +186,41 @@ class DiskManager:
         # 这确保了数据的持久性，防止因程序崩溃或断电导致数据丢失。
         self.db_file.flush()
 
+    def write_pages(self, pages: dict[int, bytearray]):
+        """
+        批量写入多个页。按 page_id 排序后，将连续的页合并为一次 pwritev（或 seek + write），
+        全部写完后只调用一次 flush()，减少刷盘时的系统调用次数。
+
+        Args:
+            pages (dict[int, bytearray]): page_id 到页面数据的映射。
+        """
+        ordered = sorted(pages)
+        for page_id in ordered:
+            if page_id >= self.num_pages:
+                raise IndexError(f"Page ID {page_id} is out of bounds (total pages: {self.num_pages}).")
+            if len(pages[page_id]) != self.page_size:
+                raise ValueError(f"Data to write has size {len(pages[page_id])}, but page size is {self.page_size}.")
+        if not ordered:
+            return
+
+        # 先把 Python 层缓冲的数据写出，避免与下面直接对文件描述符的写入交错
+        self.db_file.flush()
+        i = 0
+        while i < len(ordered):
+            # 找出从 ordered[i] 开始的一段连续页
+            j = i + 1
+            while j < len(ordered) and ordered[j] == ordered[j - 1] + 1:
+                j += 1
+            offset = ordered[i] * self.page_size
+            buffers = [pages[page_id] for page_id in ordered[i:j]]
+            # 聚集写：一次系统调用写出整段连续页；平台不支持或写入不完整时退回 seek + write
+            if not (_HAS_PWRITEV and
+                    os.pwritev(self.db_file.fileno(), buffers, offset) == len(buffers) * self.page_size):
+                self.db_file.seek(offset)
+                self.db_file.write(b''.join(buffers))
+            i = j
+        self.db_file.flush()
+
     # --- 4. 页面分配 (已修正) ---
     def allocate_page(self) -> int:
         """
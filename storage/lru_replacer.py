@@ -45,13 +45,18 @@ class LRUReplacer:
         if frame_id in self.cache:
             del self.cache[frame_id]
 
-    def unpin(self, frame_id: int):
+    def unpin(self, frame_id: int, cold: bool = False):
         """
         当一个页的 pin_count 变为 0 时，它成为可淘汰的候选者。
-        我们将其加入到 LRU 跟踪列表的“最新”一端。
+        通常将其加入到 LRU 跟踪列表的“最新”一端；
+        对于顺序扫描这类只访问一次的页面（cold=True），则放到“最旧”一端，
+        使其最先被淘汰，避免一次全表扫描把热点页面全部挤出缓冲池。
         Args:
             frame_id (int): 被解钉的帧的 ID。
+            cold (bool): 是否作为冷页面加入，默认为 False。
         """
         if frame_id not in self.cache and len(self.cache) < self.capacity:
             # 将其添加到末尾，表示“最近使用”。
             self.cache[frame_id] = None
+            if cold:
+                self.cache.move_to_end(frame_id, last=False)
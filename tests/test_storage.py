@@ -1,9 +1,7 @@
 # -*- coding: utf-8 -*-
 
 """
-数据库存储引擎组件的单元测试。
-要运行这些测试，请确保 disk_manager.py, lru_replacer.py,
-和 buffer_pool_manager.py 文件位于同一目录中。
+存储层组件（DiskManager、替换策略、BufferPoolManager）的单元测试。
 """
 
 import unittest
@@ -12,11 +10,10 @@ import threading
 import time
 import random
 
-# 假设你的代码分别在以下三个文件中
-# 如果 Page 类不在 buffer_pool_manager.py 中，请相应调整导入
-from disk_manager import DiskManager
-from lru_replacer import LRUReplacer
-from buffer_pool_manager import BufferPoolManager, Page
+from storage.disk_manager import DiskManager
+from storage.lru_replacer import LRUReplacer
+from storage.clock_replacer import ClockReplacer
+from storage.buffer_pool_manager import BufferPoolManager, Page
 
 
 class TestDiskManager(unittest.TestCase):
@@ -72,6 +69,40 @@ class TestDiskManager(unittest.TestCase):
             self.disk_manager.write_page(page_id, invalid_data)
 
 
+    def test_write_pages(self):
+        """测试批量写入：连续和不连续的页都写到正确的位置，未写入的页保持不变。"""
+        for _ in range(5):
+            self.disk_manager.allocate_page()
+        page_size = self.disk_manager.page_size
+        pages = {page_id: bytearray(bytes([65 + page_id]) * page_size) for page_id in (0, 1, 3, 4)}
+        self.disk_manager.write_pages(pages)
+
+        for page_id in range(5):
+            expected = pages.get(page_id, bytearray(page_size))
+            self.assertEqual(self.disk_manager.read_page(page_id), expected)
+        with self.assertRaises(IndexError):
+            self.disk_manager.write_pages({5: bytearray(page_size)})
+
+    def test_advise_willneed(self):
+        """测试预读提示：只是提示，不改变页面内容，越界的页被忽略。"""
+        for _ in range(3):
+            self.disk_manager.allocate_page()
+        self.disk_manager.advise_willneed([2, 0, 1, 7])
+        self.assertEqual(self.disk_manager.read_page(1), bytearray(self.disk_manager.page_size))
+
+    def test_read_pages_into_buffers(self):
+        """测试批量读取时，给出目标缓冲区的页直接读入其中，其余页分配新的缓冲区。"""
+        for _ in range(3):
+            self.disk_manager.allocate_page()
+        page_size = self.disk_manager.page_size
+        self.disk_manager.write_pages({page_id: bytearray(bytes([65 + page_id]) * page_size) for page_id in range(3)})
+
+        buffer = bytearray(page_size)
+        pages = self.disk_manager.read_pages([0, 1, 2], {1: buffer})
+        self.assertIs(pages[1], buffer)
+        for page_id in range(3):
+            self.assertEqual(pages[page_id], bytes([65 + page_id]) * page_size)
+
 class TestLRUReplacer(unittest.TestCase):
     """LRUReplacer 的测试套件。"""
 
@@ -109,6 +140,15 @@ class TestLRUReplacer(unittest.TestCase):
 
         self.assertIsNone(self.lru_replacer.victim())
 
+    def test_unpin_cold(self):
+        """测试以冷页面解钉的帧会最先被淘汰。"""
+        self.lru_replacer.unpin(0)
+        self.lru_replacer.unpin(1)
+        self.lru_replacer.unpin(2, cold=True)
+
+        self.assertEqual(self.lru_replacer.victim(), 2)
+        self.assertEqual(self.lru_replacer.victim(), 0)
+
     def test_pin_unpin_sequence(self):
         """测试解钉、钉住和再次解钉的序列。"""
         self.lru_replacer.unpin(0)
@@ -120,6 +160,51 @@ class TestLRUReplacer(unittest.TestCase):
         self.assertEqual(self.lru_replacer.victim(), 1)
 
 
+class TestClockReplacer(unittest.TestCase):
+    """ClockReplacer 的测试套件。"""
+
+    def setUp(self):
+        self.clock_replacer = ClockReplacer(capacity=5)
+
+    def test_second_chance(self):
+        """测试被再次访问的帧获得第二次机会，冷页面和钉住的帧按预期处理。"""
+        for i in range(3):
+            self.clock_replacer.unpin(i)
+        self.assertEqual(self.clock_replacer.victim(), 0)
+
+        self.clock_replacer.unpin(0)  # 0 重新可淘汰，且引用位被置上
+        self.clock_replacer.pin(1)
+        self.assertEqual(self.clock_replacer.victim(), 2)
+        self.assertEqual(self.clock_replacer.victim(), 0)
+        self.assertIsNone(self.clock_replacer.victim())
+
+        self.clock_replacer.unpin(3)
+        self.clock_replacer.unpin(4, cold=True)
+        self.assertEqual(self.clock_replacer.victim(), 4)
+
+    def test_buffer_pool_with_clock_replacer(self):
+        """测试 BufferPoolManager 使用 ClockReplacer 时页面可以被正确淘汰和读回。"""
+        db_filename = "test_clock.db"
+        if os.path.exists(db_filename):
+            os.remove(db_filename)
+        disk_manager = DiskManager(db_filename, page_size=128)
+        try:
+            bpm = BufferPoolManager(3, disk_manager, ClockReplacer(3))
+            page_ids = []
+            for i in range(6):
+                page = bpm.new_page()
+                page.data[0] = i
+                page_ids.append(page.page_id)
+                bpm.unpin_page(page.page_id, True)
+            for i, page_id in enumerate(page_ids):
+                page = bpm.fetch_page(page_id)
+                self.assertEqual(page.data[0], i)
+                bpm.unpin_page(page_id, False)
+        finally:
+            disk_manager.close()
+            os.remove(db_filename)
+
+
 class TestBufferPoolManager(unittest.TestCase):
     """BufferPoolManager 的测试套件。"""
 
@@ -231,6 +316,127 @@ class TestBufferPoolManager(unittest.TestCase):
         # **修正**: 不在此处关闭 bpm2
         # bpm2.close()
 
+    def test_evicted_frame_buffer_reused(self):
+        """测试新页面和从磁盘读入的页面复用被逐出页面的缓冲区，且内容正确。"""
+        buffers = []
+        for i in range(self.pool_size):
+            page = self.bpm.new_page()
+            page.data[:] = f"page_{i}".encode().ljust(self.page_size, b'\0')
+            buffers.append(page.data)
+            self.assertTrue(self.bpm.unpin_page(i, is_dirty=True))
+
+        # 逐出 page 0：新页面就地清零后复用它的缓冲区
+        new_page = self.bpm.new_page()
+        self.assertIs(new_page.data, buffers[0])
+        self.assertEqual(new_page.data, bytearray(self.page_size))
+        self.assertTrue(self.bpm.unpin_page(new_page.page_id, False))
+
+        # 逐出 page 1：从磁盘读回的 page 0 直接读入它的缓冲区
+        fetched_page0 = self.bpm.fetch_page(0)
+        self.assertIs(fetched_page0.data, buffers[1])
+        self.assertEqual(fetched_page0.data, b"page_0".ljust(self.page_size, b'\0'))
+        self.assertTrue(self.bpm.unpin_page(0, False))
+
+    def test_fetch_from_compressed_pool(self):
+        """测试被逐出的页面会从压缩页缓存中取回，且内容与磁盘一致。"""
+        lru_replacer2 = LRUReplacer(self.pool_size)
+        bpm2 = BufferPoolManager(self.pool_size, self.disk_manager, lru_replacer2, self.pool_size)
+        for i in range(self.pool_size + 1):
+            page = bpm2.new_page()
+            page.data[:] = f"page_{i}".encode().ljust(self.page_size, b'\0')
+            self.assertTrue(bpm2.unpin_page(page.page_id, is_dirty=True))
+
+        # page 0 已被逐出：脏数据写回了磁盘，同时保留了压缩副本
+        self.assertEqual(len(bpm2.compressed_pages), 1)
+        self.assertEqual(self.disk_manager.read_page(0), b"page_0".ljust(self.page_size, b'\0'))
+
+        fetched_page0 = bpm2.fetch_page(0)
+        self.assertEqual(fetched_page0.data, b"page_0".ljust(self.page_size, b'\0'))
+        self.assertEqual(bpm2.get_stats()["compressed_hits"], 1)
+        self.assertTrue(bpm2.unpin_page(0, False))
+
+        # 取回 page 0 时逐出了 page 1；删除页面后，其压缩副本也不应再被使用
+        self.assertIn(1, bpm2.compressed_pages.cache)
+        self.assertTrue(bpm2.delete_page(1))
+        self.assertNotIn(1, bpm2.compressed_pages.cache)
+
+    def test_prefetch_pages(self):
+        """测试预读的页面以未钉住的状态载入缓冲池，随后的获取直接命中。"""
+        for i in range(4):
+            page = self.bpm.new_page()
+            page.data[:] = f"page_{i}".encode().ljust(self.page_size, b'\0')
+            self.assertTrue(self.bpm.unpin_page(page.page_id, is_dirty=True))
+        self.bpm.flush_all_pages()
+
+        lru_replacer2 = LRUReplacer(self.pool_size)
+        bpm2 = BufferPoolManager(self.pool_size, self.disk_manager, lru_replacer2)
+        # pool_size 为 5，一次最多预读 2 页；越界的页被忽略
+        self.assertEqual(bpm2.prefetch([1, 2, 3, 99]), 2)
+        self.assertEqual(bpm2.pages[bpm2.page_table[1]].pin_count, 0)
+
+        fetched_page2 = bpm2.fetch_page(2)
+        self.assertEqual(fetched_page2.data, b"page_2".ljust(self.page_size, b'\0'))
+        self.assertEqual(bpm2.get_stats()["hits"], 1)
+        self.assertTrue(bpm2.unpin_page(2, False))
+
+    def test_sequential_read_ahead(self):
+        """测试连续递增的未命中达到阈值后，缓冲池会自动预读后续页面。"""
+        for i in range(8):
+            page = self.bpm.new_page()
+            self.assertTrue(self.bpm.unpin_page(page.page_id, is_dirty=True))
+        self.bpm.flush_all_pages()
+
+        bpm2 = BufferPoolManager(self.pool_size, self.disk_manager, LRUReplacer(self.pool_size))
+        bpm2.READ_AHEAD_THRESHOLD = 3
+        for pid in range(3):
+            bpm2.fetch_page(pid)
+            bpm2.unpin_page(pid, False)
+        # 第 3 次连续未命中触发预读（pool_size 为 5，一次最多 2 页）
+        self.assertIn(3, bpm2.page_table)
+        self.assertIn(4, bpm2.page_table)
+        bpm2.fetch_page(3)
+        self.assertEqual(bpm2.get_stats()["hits"], 1)
+        bpm2.unpin_page(3, False)
+
+    def test_purge_older_than(self):
+        """测试按时间清理：只逐出超时且未钉住的页面，脏页先写回，帧归还空闲列表。"""
+        old_page = self.bpm.new_page()
+        old_page_id = old_page.page_id
+        old_page.data[0] = 7
+        old_buffer = old_page.data
+        old_frame_id = self.bpm.page_table[old_page_id]
+        self.bpm.unpin_page(old_page_id, is_dirty=True)
+        old_page.last_unpinned -= 100
+        pinned_page = self.bpm.new_page()
+
+        self.assertEqual(self.bpm.purge_older_than(50), 1)
+        self.assertNotIn(old_page_id, self.bpm.page_table)
+        self.assertIn(pinned_page.page_id, self.bpm.page_table)
+        self.assertEqual(len(self.bpm.free_list), self.pool_size - 1)
+        self.assertEqual(self.disk_manager.read_page(old_page_id)[0], 7)
+        # 空出的帧保留缓冲区，之后载入该帧的页面直接复用
+        self.assertIs(self.bpm.pages[old_frame_id].data, old_buffer)
+        self.bpm.unpin_page(pinned_page.page_id, False)
+
+    def test_scan_hint_keeps_hot_pages(self):
+        """测试扫描访问提示：只被扫描访问过的页面按冷页面淘汰，被随机访问过的页面不会被扫描降级。"""
+        hot_id = self.bpm.new_page().page_id
+        scan_id = self.bpm.new_page().page_id
+        self.bpm.unpin_page(hot_id, False)
+        self.bpm.unpin_page(scan_id, False)
+        self.bpm.flush_all_pages()
+        self.assertEqual(self.bpm.purge_older_than(-1), 2)
+
+        self.bpm.fetch_page(hot_id)
+        self.bpm.unpin_page(hot_id, False)
+        for page_id in (scan_id, hot_id):
+            self.bpm.fetch_page(page_id, cold=True)
+            self.bpm.unpin_page(page_id, False, cold=True)
+
+        self.assertFalse(self.bpm.pages[self.bpm.page_table[hot_id]].scan_only)
+        self.assertEqual(self.lru_replacer.victim(), self.bpm.page_table[scan_id])
+        self.assertEqual(self.lru_replacer.victim(), self.bpm.page_table[hot_id])
+
     def test_delete_pinned_page(self):
         """测试被钉住的页面不能被删除。"""
         page = self.bpm.new_page()
@@ -0,0 +1,542 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+存储引擎（StorageEngine）的单元测试
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sql.ast import ColumnDefinition, DataType, ColumnConstraint
+from engine.storage_engine import StorageEngine
+from engine.data_page import DataPage
+from engine.catalog_page import CatalogPage
+from engine.constants import PAGE_SIZE
+from engine.exceptions import PrimaryKeyViolationError, TableNotFoundError
+from storage.disk_manager import DiskManager
+from storage.buffer_pool_manager import BufferPoolManager
+from storage.lru_replacer import LRUReplacer
+
+
+class TestStorageEngine(unittest.TestCase):
+    """StorageEngine 的测试套件。"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.disk_manager = DiskManager(os.path.join(self.tmp_dir.name, "test_engine.db"))
+        self.bpm = BufferPoolManager(16, self.disk_manager, LRUReplacer(16))
+        self.engine = StorageEngine(self.bpm)
+        self.engine.create_table("points", [
+            ColumnDefinition("id", DataType.INT, [(ColumnConstraint.PRIMARY_KEY, None)]),
+            ColumnDefinition("x", DataType.FLOAT),
+            ColumnDefinition("y", DataType.FLOAT),
+        ])
+
+    def tearDown(self):
+        self.disk_manager.close()
+        self.tmp_dir.cleanup()
+
+    def test_pack_float_columns_round_trip(self):
+        """测试浮点列的打包传输格式可以无损还原（float32 精度内）。"""
+        rows = [{"id": i, "x": i + 0.5, "y": -i * 0.25} for i in range(10)]
+        rows.append({"id": 10, "x": None, "y": 1.0})
+        blob = self.engine.pack_float_columns(rows, ["x", "y"])
+
+        unpacked = StorageEngine.unpack_float_columns(blob, 2)
+        self.assertEqual(len(unpacked), 11)
+        self.assertEqual(unpacked[:10], [(i + 0.5, -i * 0.25) for i in range(10)])
+        self.assertNotEqual(unpacked[10][0], unpacked[10][0])  # NULL -> NaN
+        with self.assertRaises(ValueError):
+            StorageEngine.unpack_float_columns(blob, 3)
+
+    def test_serialize_row_update_matches_full_serialization(self):
+        """测试只重新编码被修改列的序列化结果与完整序列化一致。"""
+        self.engine.create_table("people", [
+            ColumnDefinition("id", DataType.INT, [(ColumnConstraint.PRIMARY_KEY, None)]),
+            ColumnDefinition("name", DataType.STRING),
+            ColumnDefinition("age", DataType.INT),
+            ColumnDefinition("score", DataType.FLOAT),
+            ColumnDefinition("city", DataType.TEXT),
+        ])
+        old_row = {"id": 1, "name": "Alice", "age": 30, "score": 1.5, "city": "Paris"}
+        old_data = self.engine._serialize_row("people", old_row)
+        for changes in ({"age": 31}, {"name": "Bob"}, {"city": "Rome", "score": 2.5}, {}):
+            new_row = dict(old_row, **changes)
+            self.assertEqual(
+                self.engine._serialize_row_update("people", old_data, new_row, set(changes)),
+                self.engine._serialize_row("people", new_row))
+
+    def test_lazy_row_decodes_on_access(self):
+        """测试 LazyRow 按需解码的结果与完整解码一致。"""
+        self.engine.create_table("people", [
+            ColumnDefinition("id", DataType.INT, [(ColumnConstraint.PRIMARY_KEY, None)]),
+            ColumnDefinition("name", DataType.STRING),
+            ColumnDefinition("score", DataType.FLOAT),
+        ])
+        row = {"id": 7, "name": "Zoë", "score": 0.5}
+        row_data = self.engine._serialize_row("people", row)
+
+        lazy = self.engine.lazy_row("people", row_data)
+        self.assertEqual(lazy["score"], 0.5)
+        self.assertIsNone(lazy.get("missing"))
+        self.assertEqual(list(lazy), ["id", "name", "score"])
+        self.assertEqual(dict(lazy), self.engine._decode_row("people", row_data))
+
+    def test_bulk_insert_rows(self):
+        """测试批量插入：数据全部写入，主键索引自底向上构建后仍可查找和继续插入。"""
+        rows = []
+        for i in range(1000):
+            row = {"id": i, "x": i * 0.5, "y": 0.0}
+            rows.append((self.engine._serialize_row("points", row), row))
+        self.assertEqual(self.engine.bulk_insert_rows("points", rows), 1000)
+
+        index = self.engine.get_index_manager("points").get_index_for_column("id")
+        for i in (0, 499, 999):
+            rid = index.search(self.engine._prepare_key_for_b_tree(i, DataType.INT))
+            row_data = self.engine.read_row("points", rid)
+            self.assertEqual(self.engine._decode_row("points", row_data)["id"], i)
+        self.assertEqual(len(self.engine.scan_table("points")), 1000)
+        self.assertEqual(list(self.engine.iter_table("points")), self.engine.scan_table("points"))
+
+        # 批量构建后的树仍支持常规插入（会触发叶子分裂）
+        for i in range(1000, 1300):
+            row = {"id": i, "x": 0.0, "y": 0.0}
+            self.engine.insert_row("points", self.engine._serialize_row("points", row), row)
+        self.assertIsNotNone(index.search(self.engine._prepare_key_for_b_tree(1299, DataType.INT)))
+
+        # 与已有主键重复时整批不生效
+        with self.assertRaises(PrimaryKeyViolationError):
+            self.engine.bulk_insert_rows("points", rows[:1])
+        self.assertEqual(len(self.engine.scan_table("points")), 1300)
+
+    def test_bulk_insert_into_existing_index(self):
+        """测试向非空索引批量插入：已有条目不多于本批时归并后整体重建，否则按叶子成段合并（insert_many），新旧键都能查到。"""
+        index_manager = self.engine.get_index_manager("points")
+        trees = []
+        for start in (500, 0, 1000):
+            rows = []
+            for i in range(start, start + 500):
+                row = {"id": i, "x": 0.0, "y": 0.0}
+                rows.append((self.engine._serialize_row("points", row), row))
+            self.assertEqual(self.engine.bulk_insert_rows("points", rows), 500)
+            trees.append(index_manager.get_index_for_column("id"))
+        # 第二批（500 条已有）触发重建，第三批（1000 条已有）合并进已有的树
+        self.assertIsNot(trees[0], trees[1])
+        self.assertIs(trees[1], trees[2])
+
+        index = index_manager.get_index_for_column("id")
+        self.assertEqual([key for key, _ in index.iter_items()],
+                         [self.engine._prepare_key_for_b_tree(i, DataType.INT) for i in range(1500)])
+        for i in range(0, 1500, 7):
+            rid = index.search(self.engine._prepare_key_for_b_tree(i, DataType.INT))
+            self.assertEqual(self.engine._decode_row("points", self.engine.read_row("points", rid))["id"], i)
+
+    def test_commit_batches_consecutive_inserts(self):
+        """测试提交事务时，同一张表上连续的 INSERT 合并为批量插入：提交前不可见，提交后数据和索引都完整。"""
+        txn_id = self.engine.txn_manager.begin_transaction()
+        for i in range(200):
+            row = {"id": i, "x": 0.0, "y": 0.0}
+            self.engine.insert_row("points", self.engine._serialize_row("points", row), row, txn_id)
+        self.assertEqual(self.engine.scan_table("points"), [])
+        self.engine.txn_manager.commit_transaction(txn_id)
+
+        index = self.engine.get_index_manager("points").get_index_for_column("id")
+        self.assertEqual(len(list(index.iter_rids())), 200)
+        self.assertEqual(sorted(row["id"] for _, row in self.engine.scan_table_fixed_width("points")), list(range(200)))
+
+    def test_update_row_in_place_and_relocate(self):
+        """测试更新：变短时原地更新且不影响其后的行，变长放不下时迁移到其他页并更新索引。"""
+        self.engine.create_table("notes", [
+            ColumnDefinition("id", DataType.INT, [(ColumnConstraint.PRIMARY_KEY, None)]),
+            ColumnDefinition("body", DataType.TEXT),
+        ])
+        index = self.engine.get_index_manager("notes").get_index_for_column("id")
+        key = lambda i: self.engine._prepare_key_for_b_tree(i, DataType.INT)
+        for i in range(10):
+            row = {"id": i, "body": "x" * 300}
+            self.engine.insert_row("notes", self.engine._serialize_row("notes", row), row)
+
+        rid = index.search(key(3))
+        self.assertTrue(self.engine.update_row("notes", rid, {"id": 3, "body": "short"}, changed_columns={"body"}))
+        self.assertEqual(index.search(key(3)), rid)
+        rows = {r["id"]: r["body"] for r in (self.engine._decode_row("notes", d) for _, d in self.engine.scan_table("notes"))}
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(rows[3], "short")
+
+        rid = index.search(key(5))
+        self.assertTrue(self.engine.update_row("notes", rid, {"id": 5, "body": "y" * 3000}, changed_columns={"body"}))
+        new_rid = index.search(key(5))
+        self.assertNotEqual(new_rid, rid)
+        self.assertIsNone(self.engine.read_row("notes", rid))
+        self.assertEqual(self.engine._decode_row("notes", self.engine.read_row("notes", new_rid))["body"], "y" * 3000)
+        self.assertEqual(len(self.engine.scan_table("notes")), 10)
+
+        # 键不变时 B+ 树原地改写 RID；键不存在时不做任何修改
+        self.assertTrue(index.update(key(7), (99, 0)))
+        self.assertEqual(index.search(key(7)), (99, 0))
+        self.assertFalse(index.update(key(42), (99, 0)))
+        self.assertIsNone(index.search(key(42)))
+
+    def test_reindex_bulk_builds_from_table_data(self):
+        """测试 REINDEX：从表数据批量重建索引后，所有键仍能查到原来的行。"""
+        rows = []
+        for i in range(2000):
+            row = {"id": (i * 7919) % 2000 - 1000, "x": float(i), "y": 0.0}
+            rows.append((self.engine._serialize_row("points", row), row))
+        self.engine.bulk_insert_rows("points", rows)
+        index = self.engine.get_index_manager("points").get_index_for_column("id")
+        expected = {row["id"]: index.search(self.engine._prepare_key_for_b_tree(row["id"], DataType.INT)) for _, row in rows}
+
+        self.engine.reindex("points")
+        index = self.engine.get_index_manager("points").get_index_for_column("id")
+        for value, rid in expected.items():
+            self.assertEqual(index.search(self.engine._prepare_key_for_b_tree(value, DataType.INT)), rid)
+        self.assertIsNone(index.search(self.engine._prepare_key_for_b_tree(5000, DataType.INT)))
+        with self.assertRaises(TableNotFoundError):
+            self.engine.reindex("missing")
+
+    def test_scan_table_by_index_in_key_order(self):
+        """测试沿索引叶子链扫描：按索引列的顺序返回全部行，且与全表扫描的行一致。"""
+        ids = [(i * 7919) % 3000 - 1500 for i in range(3000)]
+        for i in ids:
+            row = {"id": i, "x": float(i), "y": 0.0}
+            self.engine.insert_row("points", self.engine._serialize_row("points", row), row)
+
+        rows = self.engine.scan_table_by_index("points", "id")
+        self.assertEqual([self.engine._decode_row("points", data)["id"] for _, data in rows], sorted(ids))
+        self.assertEqual({rid for rid, _ in rows}, {rid for rid, _ in self.engine.scan_table("points")})
+        index = self.engine.get_index_manager("points").get_index_for_column("id")
+        self.assertEqual(list(index.iter_rids()), [rid for _, rid in index.iter_items()])
+        with self.assertRaises(ValueError):
+            self.engine.scan_table_by_index("points", "x")
+
+    def test_multi_get_by_index(self):
+        """测试按索引批量查找：结果与 values 顺序一致，找不到的值返回 None。"""
+        for i in range(500):
+            row = {"id": i, "x": float(i), "y": 0.0}
+            self.engine.insert_row("points", self.engine._serialize_row("points", row), row)
+
+        values = [400, 3, 9999, 250, 3]
+        results = self.engine.multi_get("points", "id", values)
+        self.assertIsNone(results[2])
+        for value, result in zip(values, results):
+            if value != 9999:
+                self.assertEqual(self.engine._decode_row("points", result[1])["id"], value)
+        self.assertEqual(results[1], results[4])
+
+    def test_pk_lookup_cache(self):
+        """测试主键点查缓存：默认关闭；启用后命中直接返回，容量有界，删除、更新主键和批量重建索引后不会返回过期的 RID。"""
+        for i in range(100):
+            row = {"id": i, "x": 0.0, "y": 0.0}
+            self.engine.insert_row("points", self.engine._serialize_row("points", row), row)
+        key = lambda value: self.engine._prepare_key_for_b_tree(value, DataType.INT)
+        index_manager = self.engine.get_index_manager("points")
+        index_manager.search("id", key(5))
+        self.assertEqual(len(index_manager._pk_rids), 0)
+
+        self.bpm.flush_all_pages()
+        self.engine = StorageEngine(self.bpm, pk_lookup_cache_size=8)
+        index_manager = self.engine.get_index_manager("points")
+        for i in range(20):
+            index_manager.search("id", key(i))
+        self.assertEqual(list(index_manager._pk_rids), [key(i) for i in range(12, 20)])
+
+        rid = index_manager.search("id", key(5))
+        self.assertEqual(index_manager._pk_rids[key(5)], rid)
+        self.assertEqual(len(index_manager._pk_rids), 8)
+        self.assertEqual(index_manager.search("id", key(5)), rid)
+
+        self.engine.delete_row("points", rid)
+        self.assertIsNone(index_manager.search("id", key(5)))
+
+        rid = index_manager.search("id", key(6))
+        self.engine.update_row("points", rid, {"id": 5, "x": 0.0, "y": 0.0})
+        self.assertIsNone(index_manager.search("id", key(6)))
+        self.assertEqual(self.engine.multi_get("points", "id", [5])[0][0], rid)
+
+        index_manager.rebuild_index("idx_points_id")
+        self.assertEqual(index_manager._pk_rids, {})
+        self.assertEqual(index_manager.search("id", key(5)), rid)
+
+    def test_column_reader(self):
+        """测试单列读取函数：定长偏移和变长列之后的列都能读出与整行解码相同的值。"""
+        self.engine.create_table("mixed", [
+            ColumnDefinition("id", DataType.INT, [(ColumnConstraint.PRIMARY_KEY, None)]),
+            ColumnDefinition("score", DataType.FLOAT),
+            ColumnDefinition("name", DataType.TEXT),
+            ColumnDefinition("age", DataType.INT),
+        ])
+        row = {"id": -7, "score": 1.5, "name": "名字", "age": 42}
+        row_data = self.engine._serialize_row("mixed", row)
+        for col_name, value in row.items():
+            self.assertEqual(self.engine._get_column_reader("mixed", col_name)(row_data), value)
+        with self.assertRaises(ValueError):
+            self.engine._get_column_reader("mixed", "missing")
+
+    def test_fixed_width_scan_with_equality(self):
+        """测试全定长表的等值下推扫描：结果与全表扫描后再过滤一致，且不包含已删除的行。"""
+        for i in range(300):
+            row = {"id": i, "x": float(i % 7), "y": 0.0}
+            self.engine.insert_row("points", self.engine._serialize_row("points", row), row)
+        deleted_rid = next(rid for rid, row in self.engine.scan_table_fixed_width("points") if row["id"] == 3)
+        self.engine.delete_row("points", deleted_rid)
+
+        matched = self.engine.scan_table_fixed_width("points", ("x", 3.0))
+        expected = [(rid, row) for rid, row in self.engine.scan_table_fixed_width("points") if row["x"] == 3.0]
+        self.assertEqual(matched, expected)
+        self.assertNotIn(deleted_rid, [rid for rid, _ in matched])
+        with self.assertRaises(ValueError):
+            self.engine.scan_table_fixed_width("points", ("missing", 1))
+
+    def test_catalog_serialized_on_write_back(self):
+        """测试目录页延迟序列化：建表只标记修改，目录页写回磁盘时才序列化，且内容完整。"""
+        for name in ("t1", "t2", "t3"):
+            self.engine.create_table(name, [ColumnDefinition("id", DataType.INT, [(ColumnConstraint.PRIMARY_KEY, None)])])
+        self.assertTrue(self.engine._catalog_dirty)
+        catalog_frame = self.bpm.fetch_page(0)
+        frame_data = catalog_frame.data
+        self.bpm.unpin_page(0, False)
+
+        self.bpm.flush_all_pages()
+        self.assertFalse(self.engine._catalog_dirty)
+        # 目录页直接序列化到原有的帧缓冲区中
+        self.assertIs(catalog_frame.data, frame_data)
+        on_disk = CatalogPage.deserialize(self.disk_manager.read_page(0))
+        self.assertEqual(set(on_disk.tables), {"points", "t1", "t2", "t3"})
+        self.assertIn("idx_t3_id", on_disk.get_table_metadata("t3")["indexes"])
+
+    def test_catalog_overflow_fails_create_table(self):
+        """测试目录放不下新表时由 CREATE TABLE 本身报错并撤销，之后的写回仍然成功，已有的表不受影响。"""
+        columns = [ColumnDefinition("id", DataType.INT, [(ColumnConstraint.PRIMARY_KEY, None)])] + \
+                  [ColumnDefinition(f"column_with_a_long_name_{i}", DataType.INT) for i in range(40)]
+        with self.assertRaises(RuntimeError):
+            self.engine.create_table("wide", columns)
+        self.assertNotIn("wide", self.engine.catalog_page.tables)
+        self.assertIsNone(self.engine.get_index_manager("wide"))
+
+        self.assertTrue(self.bpm.flush_all_pages())
+        on_disk = CatalogPage.deserialize(self.disk_manager.read_page(0))
+        self.assertEqual(set(on_disk.tables), {"points"})
+
+    def test_int_index_keys_order_and_upgrade(self):
+        """测试 INT 索引键的字节序与数值序一致，且旧键编码版本的目录在加载时会重建 INT 索引。"""
+        keys = [self.engine._prepare_key_for_b_tree(v, DataType.INT) for v in (-2 ** 31, -5, -1, 0, 1, 7, 2 ** 31 - 1)]
+        self.assertEqual(keys, sorted(keys))
+
+        for i in range(-50, 50):
+            row = {"id": i, "x": 0.0, "y": 0.0}
+            self.engine.insert_row("points", self.engine._serialize_row("points", row), row)
+        self.engine.catalog_page.key_format_version = 1
+        self.engine._flush_catalog_page()
+        self.bpm.flush_all_pages()
+
+        reopened = StorageEngine(self.bpm)
+        self.assertEqual(reopened.catalog_page.key_format_version, CatalogPage.KEY_FORMAT_VERSION)
+        index = reopened.get_index_manager("points").get_index_for_column("id")
+        for i in (-50, -1, 0, 49):
+            rid = index.search(reopened._prepare_key_for_b_tree(i, DataType.INT))
+            self.assertEqual(reopened._decode_row("points", reopened.read_row("points", rid))["id"], i)
+
+    def test_table_heap_cache_persists_new_pages(self):
+        """测试堆页目录缓存：插入新分配的数据页会写回堆页面，重新打开引擎后仍能扫描到全部行。"""
+        for i in range(600):
+            row = {"id": i, "x": 0.0, "y": 0.0}
+            self.engine.insert_row("points", self.engine._serialize_row("points", row), row)
+        _, table_heap = self.engine._get_table_heap("points")
+        self.assertGreater(len(table_heap.get_page_ids()), 1)
+
+        self.bpm.flush_all_pages()
+        reopened = StorageEngine(self.bpm)
+        self.assertEqual(len(reopened.scan_table("points")), 600)
+        self.assertEqual(reopened._get_table_heap("points")[1].get_page_ids(), table_heap.get_page_ids())
+
+    def test_light_scan_for_large_tables(self):
+        """测试数据页多于缓冲池容量时走轻量扫描：结果完整（包括尚未写回的脏页），且不替换缓冲池中的页面。"""
+        self.engine.create_table("docs", [
+            ColumnDefinition("id", DataType.INT, [(ColumnConstraint.PRIMARY_KEY, None)]),
+            ColumnDefinition("body", DataType.TEXT),
+        ])
+        for i in range(80):
+            row = {"id": i, "body": str(i) * (1000 // len(str(i)))}
+            self.engine.insert_row("docs", self.engine._serialize_row("docs", row), row)
+        self.assertGreater(len(self.engine._get_table_heap("docs")[1].get_page_ids()), self.bpm.pool_size)
+
+        replacements = self.bpm.get_stats()["replacements"]
+        rows = [self.engine._decode_row("docs", data) for _, data in self.engine.scan_table("docs")]
+        self.assertEqual(sorted(row["id"] for row in rows), list(range(80)))
+        self.assertEqual(self.bpm.get_stats()["replacements"], replacements)
+
+        # 全定长列的表（SeqScan 和等值下推走 scan_table_fixed_width）同样走轻量扫描
+        points = [{"id": i, "x": float(i), "y": 0.5} for i in range(6000)]
+        self.engine.bulk_insert_rows("points", [(self.engine._serialize_row("points", row), row) for row in points])
+        self.assertGreater(len(self.engine._get_table_heap("points")[1].get_page_ids()), self.bpm.pool_size)
+        replacements = self.bpm.get_stats()["replacements"]
+        self.assertEqual(len(self.engine.scan_table_fixed_width("points")), 6000)
+        self.assertEqual([row["id"] for _, row in self.engine.scan_table_fixed_width("points", ("x", 42.0))], [42])
+        self.assertEqual(self.bpm.get_stats()["replacements"], replacements)
+
+    def test_data_page_trailer(self):
+        """测试数据页页尾：新页面记录空闲指针和记录数；旧格式页面加载时遍历重建并改用页尾。"""
+        page = DataPage(1)
+        offsets = [page.insert_row(b"row%d" % i) for i in range(3)]
+        page.delete_record(offsets[1])
+        reloaded = DataPage(1, page.get_data())
+        self.assertEqual(reloaded.free_space_pointer, page.free_space_pointer)
+        self.assertEqual(reloaded.get_record_count(), 3)
+        self.assertEqual([bytes(row) for _, row in reloaded.iter_rows()], [b"row0", b"row2"])
+
+        # 旧格式页面：只有记录，没有页尾
+        legacy = bytearray(PAGE_SIZE)
+        legacy[0:8] = (8).to_bytes(4, "little", signed=True) + b"abcd"
+        legacy_page = DataPage(2, legacy)
+        self.assertEqual((legacy_page.free_space_pointer, legacy_page.get_record_count()), (8, 1))
+        self.assertEqual(DataPage(2, legacy_page.get_data()).get_record_count(), 1)
+        self.assertLess(legacy_page.get_free_space(), PAGE_SIZE - 8)
+
+    def test_deleted_slots_reused(self):
+        """测试已删除记录的空间复用：页面写满后，新行填入足够大的已删除记录，剩余部分仍可继续复用。"""
+        page = DataPage(1)
+        offsets = []
+        while page.get_free_space() >= 4 + 100:
+            offsets.append(page.insert_row(b"a" * 100))
+        page.delete_record(offsets[2])
+        self.assertTrue(page.can_insert(4 + 40))
+        first = page.insert_row(b"b" * 40)
+        self.assertEqual(first, offsets[2])
+        second = page.insert_row(b"c" * 40)
+        self.assertEqual(second, offsets[2] + 44)
+        self.assertFalse(page.can_insert(4 + 40))
+        rows = [bytes(row) for _, row in page.iter_rows()]
+        self.assertEqual(len(rows), len(offsets) + 1)
+        self.assertEqual(rows[2:4], [b"b" * 40, b"c" * 40])
+
+        # 引擎层：最后一页写满后，新插入的行填入之前删除的记录，不分配新的数据页
+        def insert(i):
+            row = {"id": i, "x": i, "y": i}
+            self.engine.insert_row("points", self.engine._serialize_row("points", row), row)
+
+        def tail_free_space():
+            tail_page_id = self.engine._get_table_heap("points")[1].get_page_ids()[-1]
+            free_space = DataPage(tail_page_id, self.bpm.fetch_page(tail_page_id).data).get_free_space()
+            self.bpm.unpin_page(tail_page_id, False)
+            return free_space
+
+        record_length = len(self.engine._serialize_row("points", {"id": 0, "x": 0, "y": 0})) + 4
+        i = 0
+        while len(self.engine._get_table_heap("points")[1].get_page_ids()) < 2 or tail_free_space() >= record_length:
+            insert(i)
+            i += 1
+        num_pages = len(self.engine._get_table_heap("points")[1].get_page_ids())
+        deleted = [rid for rid, _ in self.engine.scan_table("points")][:50]
+        for rid in deleted:
+            row = self.engine._decode_row("points", self.engine.read_row("points", rid))
+            self.assertTrue(self.engine._do_delete_immediate("points", rid, row))
+        for k in range(50):
+            insert(10000 + k)
+        self.assertEqual(len(self.engine._get_table_heap("points")[1].get_page_ids()), num_pages)
+        index = self.engine.get_index_manager("points").get_index_for_column("id")
+        reused = {index.search(self.engine._prepare_key_for_b_tree(10000 + k, DataType.INT)) for k in range(50)}
+        self.assertEqual(reused, set(deleted))
+        self.assertEqual(len(self.engine.scan_table("points")), i)
+
+    def test_tail_record_space_returned(self):
+        """测试最后一条记录被删除或缩短时，空间直接退回页尾；变长时原地改写，偏移量不变。"""
+        page = DataPage(1)
+        offsets = [page.insert_row(b"row%d" % i) for i in range(3)]
+        end = page.free_space_pointer
+        page.delete_record(offsets[2])
+        self.assertEqual((page.free_space_pointer, page.get_record_count()), (offsets[2], 2))
+        self.assertEqual(page.insert_row(b"tail"), offsets[2])
+
+        self.assertEqual(page.update_row(offsets[2], b"x" * 20)[0], offsets[2])
+        page.update_row(offsets[2], b"y")
+        self.assertEqual(page.free_space_pointer, offsets[2] + 5)
+        reloaded = DataPage(1, page.get_data())
+        self.assertEqual([bytes(row) for _, row in reloaded.iter_rows()], [b"row0", b"row1", b"y"])
+        self.assertLess(reloaded.free_space_pointer, end)
+
+    def test_commit_skips_rids_deleted_earlier_in_commit(self):
+        """测试提交时，同一事务中先删除的行的空间被之后的 INSERT 复用后，引用旧 RID 的写记录不会作用到新行上。"""
+        def serialize(i):
+            row = {"id": i, "x": float(i), "y": 0.0}
+            return self.engine._serialize_row("points", row), row
+
+        for i in (1, 2):
+            self.engine.insert_row("points", *serialize(i))
+        tail_rid = [rid for rid, _ in self.engine.scan_table("points")][-1]
+
+        txn_id = self.engine.txn_manager.begin_transaction()
+        self.assertTrue(self.engine.delete_row("points", tail_rid, txn_id))
+        self.engine.insert_row("points", *serialize(3), txn_id)
+        self.assertTrue(self.engine.delete_row("points", tail_rid, txn_id))
+        self.assertTrue(self.engine.update_row("points", tail_rid, {"id": 2, "x": 9.0, "y": 9.0}, txn_id))
+        self.engine.txn_manager.commit_transaction(txn_id)
+
+        rows = sorted((row["id"], row["x"]) for _, row in self.engine.scan_table_fixed_width("points"))
+        self.assertEqual(rows, [(1, 1.0), (3, 3.0)])
+        index = self.engine.get_index_manager("points").get_index_for_column("id")
+        key = lambda i: self.engine._prepare_key_for_b_tree(i, DataType.INT)
+        self.assertEqual(index.search(key(3)), tail_rid)
+        self.assertIsNone(index.search(key(2)))
+
+    def test_commit_skips_deleted_slot_reused_in_commit(self):
+        """测试页面已满时，同一事务中被删除记录的空间被之后的 INSERT 复用，旧 RID 上的 DELETE 不会删掉新行。"""
+        self.engine.create_table("notes", [
+            ColumnDefinition("id", DataType.INT, [(ColumnConstraint.PRIMARY_KEY, None)]),
+            ColumnDefinition("body", DataType.TEXT),
+        ])
+
+        def serialize(i, body):
+            row = {"id": i, "body": body}
+            return self.engine._serialize_row("notes", row), row
+
+        for i in range(1, 5):
+            self.engine.insert_row("notes", *serialize(i, "x" * 1000))
+        first_rid = self.engine.scan_table("notes")[0][0]
+
+        txn_id = self.engine.txn_manager.begin_transaction()
+        self.assertTrue(self.engine.delete_row("notes", first_rid, txn_id))
+        self.engine.insert_row("notes", *serialize(5, "y" * 1000), txn_id)
+        self.assertTrue(self.engine.delete_row("notes", first_rid, txn_id))
+        self.engine.txn_manager.commit_transaction(txn_id)
+
+        index = self.engine.get_index_manager("notes").get_index_for_column("id")
+        rid = index.search(self.engine._prepare_key_for_b_tree(5, DataType.INT))
+        self.assertEqual(rid, first_rid)
+        self.assertEqual(self.engine._decode_row("notes", self.engine.read_row("notes", rid))["body"], "y" * 1000)
+        self.assertEqual(sorted(self.engine._decode_row("notes", d)["id"] for _, d in self.engine.scan_table("notes")),
+                         [2, 3, 4, 5])
+
+    def test_commit_follows_relocated_rows(self):
+        """测试提交时，行在同一事务中先被更新迁移到新 RID 后，引用旧 RID 的 DELETE 删除的是迁移后的行及其索引键。"""
+        self.engine.create_table("notes", [
+            ColumnDefinition("id", DataType.INT, [(ColumnConstraint.PRIMARY_KEY, None)]),
+            ColumnDefinition("body", DataType.TEXT),
+        ])
+        index = self.engine.get_index_manager("notes").get_index_for_column("id")
+        key = lambda i: self.engine._prepare_key_for_b_tree(i, DataType.INT)
+        for i, body in ((1, "a"), (2, "b" * 3000)):
+            row = {"id": i, "body": body}
+            self.engine.insert_row("notes", self.engine._serialize_row("notes", row), row)
+        rid = index.search(key(1))
+
+        txn_id = self.engine.txn_manager.begin_transaction()
+        self.assertTrue(self.engine.update_row("notes", rid, {"id": 1, "body": "c" * 2000}, txn_id, {"body"}))
+        self.assertTrue(self.engine.update_row("notes", rid, {"id": 10, "body": "a"}, txn_id, {"id"}))
+        self.assertTrue(self.engine.delete_row("notes", rid, txn_id))
+        self.engine.txn_manager.commit_transaction(txn_id)
+
+        self.assertEqual([self.engine._decode_row("notes", d)["id"] for _, d in self.engine.scan_table("notes")], [2])
+        self.assertIsNone(index.search(key(1)))
+        self.assertIsNone(index.search(key(10)))
+        row = {"id": 1, "body": "dup"}
+        self.engine.insert_row("notes", self.engine._serialize_row("notes", row), row)
+        with self.assertRaises(PrimaryKeyViolationError):
+            self.engine.insert_row("notes", self.engine._serialize_row("notes", row), row)
+
+if __name__ == '__main__':
+    unittest.main()